@@ -0,0 +1,244 @@
+import asyncio
+import functools
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import http_client
+import job_identity
+import memory_guard
+import seen_store
+import settings
+import sources
+
+try:
+    import ijson  # optional: parse board JSON incrementally instead of loading it whole
+except ImportError:
+    ijson = None
+
+print = functools.partial(print, flush=True)
+
+BOARD_CONCURRENCY = memory_guard.cap(settings.getint('ats', 'concurrency', 16), 4)  # boards fetched in parallel
+
+# --- ATS APIs ---
+# Each ATS: board URL, ijson prefix of the job list, a function mapping one job to
+# (job_id, title, location, url, posted, legacy_key) without touching the fields it doesn't need,
+# and one picking the other fields kept in the history archive (only called for matching jobs)
+def _format_date(value):
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M")
+    except (ValueError, OverflowError, OSError):
+        return "Unknown"
+
+def _greenhouse_job(job):
+    title = (job.get("title") or "").strip()
+    url = job.get("absolute_url", "")
+    posted = _format_date(job.get("first_published"))
+    # Greenhouse jobs used to be keyed by title and publish date
+    legacy_key = f"{title}::{posted}" if posted else None
+    return (job_identity.canonical_id(job.get("id"), url, fallback=legacy_key), title,
+            (job.get("location") or {}).get("name", ""), url, posted, legacy_key)
+
+def _lever_job(job):
+    categories = job.get("categories") or {}
+    return (job.get("id"), (job.get("text") or "").strip(), categories.get("location") or "",
+            job.get("hostedUrl", ""), _format_date(job.get("createdAt")), None)
+
+def _ashby_job(job):
+    return (job.get("id"), (job.get("title") or "").strip(), job.get("location") or "",
+            job.get("jobUrl", ""), _format_date(job.get("publishedAt")), None)
+
+def _details(values):
+    return {key: str(value) for key, value in values.items() if value not in (None, "", [], {})}
+
+def _greenhouse_details(job):
+    return _details({"updated_at": job.get("updated_at"), "requisition_id": job.get("requisition_id"),
+                     "internal_job_id": job.get("internal_job_id")})
+
+def _lever_details(job):
+    categories = job.get("categories") or {}
+    return _details({"team": categories.get("team"), "department": categories.get("department"),
+                     "commitment": categories.get("commitment"), "workplace_type": job.get("workplaceType")})
+
+def _ashby_details(job):
+    return _details({"department": job.get("department"), "team": job.get("team"),
+                     "employment_type": job.get("employmentType"), "is_remote": job.get("isRemote"),
+                     "updated_at": job.get("updatedAt")})
+
+ATS_APIS = {
+    "greenhouse": ("https://boards-api.greenhouse.io/v1/boards/{board}/jobs", "jobs.item", _greenhouse_job,
+                   _greenhouse_details),
+    "lever": ("https://api.lever.co/v0/postings/{board}?mode=json", "item", _lever_job, _lever_details),
+    "ashby": ("https://api.ashbyhq.com/posting-api/job-board/{board}", "jobs.item", _ashby_job, _ashby_details),
+}
+
+class Board:
+    def __init__(self, ats, board, company):
+        self.ats = ats
+        self.board = board
+        self.company = company
+        url, self.items_prefix, self.parse_job, self.job_details = ATS_APIS[ats]
+        self.url = url.format(board=board)
+
+    def __repr__(self):
+        return f"{self.ats}:{self.board}"
+
+def parse_board_line(line):
+    """``<ats>:<board> [= Company]`` -> Board; the ATS defaults to Greenhouse."""
+    spec, _, company = line.partition("=")
+    ats, _, board = spec.strip().rpartition(":")
+    ats = ats.strip().lower() or "greenhouse"
+    board = board.strip()
+    if ats not in ATS_APIS:
+        raise ValueError(f"Unknown ATS '{ats}' in board '{line}'")
+    return Board(ats, board, company.strip() or board.title())
+
+def iter_jobs(response, items_prefix):
+    """Stream the board's jobs one by one; falls back to a full parse without ijson."""
+    if ijson is not None:
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, items_prefix)
+        return
+    data = response.json()
+    yield from (data if items_prefix == "item" else data.get("jobs", []))
+
+def fetch_board(board, job_filter, validators, source):
+    """Fetch one board and return the matching jobs, or None if it is unchanged.
+
+    Runs on a worker thread and raises if the board can't be downloaded. Only
+    matching jobs are kept, so memory stays flat however large the board is.
+    """
+    response = http_client.conditional_get(board.url, validators, source=source, stream=True)
+    if response is None:
+        return None
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        matched = []
+        for job in iter_jobs(response, board.items_prefix):
+            job_id, title, location, url, posted, legacy_key = board.parse_job(job)
+            if job_id and job_filter.matches(title, location, posted):
+                matched.append((str(job_id), title, location, url, posted, legacy_key, board.job_details(job)))
+        return matched
+
+_executor = None
+
+def get_executor():
+    """Threads for board fetches, separate from the main loop's small default pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BOARD_CONCURRENCY, thread_name_prefix="ats")
+    return _executor
+
+# --- Source ---
+@sources.register("ats")
+class BoardsSource:
+    """Many ATS-hosted job boards (Greenhouse, Lever, Ashby) swept concurrently.
+
+    Configured by ``boards``, one ``<ats>:<board> [= Company]`` per line;
+    jobs are filtered by the source's filter spec (see filters.py).
+    """
+
+    quiet_first_run = False
+    prefiltered = True  # the filter runs on the fetch threads while each board streams
+
+    def __init__(self, name, options):
+        self.name = name
+        self.company = options.get("company", name.title())
+        self.boards = [parse_board_line(line) for line in sources.option_lines(options, "boards")]
+        self.still_listed = []
+        self._validators = {}
+        self._board_ids = {}
+
+    def ids_key(self, board):
+        return f"{self.name}:{board.url}"
+
+    async def fetch(self):
+        print(f"{self.company} search started ({len(self.boards)} boards)!")
+        store = seen_store.get_store()
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        fetched = {}
+        board_ids = {}
+
+        async def sweep(board):
+            """``(board, jobs, known_ids)``; jobs is None if the board is unchanged, both are if it failed."""
+            known_ids = store.get_watermark(self.ids_key(board))
+            # Without the ids it listed last time, a 304 couldn't say which postings are still open
+            validators = store.get_validators(board.url) if known_ids is not None else {}
+            try:
+                jobs = await loop.run_in_executor(get_executor(), fetch_board, board, self.job_filter, validators, self.name)
+            except Exception as e:
+                print(f"❌ Error fetching {board} board: {e}", file=sys.stderr)
+                return board, None, None
+            if jobs is not None:
+                fetched[board.url] = validators
+            return board, jobs, json.loads(known_ids or "[]")
+
+        self.complete = False
+        self.still_listed = []
+        unchanged = failed = matched = 0
+        tasks = [asyncio.ensure_future(sweep(board)) for board in self.boards]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                board, jobs, known_ids = await next_done
+                if known_ids is None:
+                    failed += 1
+                    continue
+                if jobs is None:
+                    # Not modified: it still lists the postings it had last time
+                    unchanged += 1
+                    self.still_listed.extend(known_ids)
+                    continue
+                matched += len(jobs)
+                board_ids[board.url] = [job[0] for job in jobs]
+                for job_id, title, location, url, posted, legacy_key, details in jobs:
+                    yield sources.JobRecord(
+                        source=self.name,
+                        job_id=job_id,
+                        company=board.company,
+                        title=title,
+                        location=location,
+                        url=url,
+                        posted=posted,
+                        aliases=(legacy_key,) if legacy_key else (),
+                        details=details,
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
+        print(f"🏢 Swept {len(self.boards)} boards in {time.monotonic() - start:.1f}s: "
+              f"{matched} matching jobs, {unchanged} unchanged, {failed} failed.")
+        # Unchanged boards are listed by their ids from last time, so only a failed board leaves postings out
+        self.complete = failed == 0
+        self._validators = fetched
+        self._board_ids = board_ids
+
+    async def commit(self):
+        store = seen_store.get_store()
+        boards = {board.url: board for board in self.boards}
+        for url, validators in self._validators.items():
+            # Saved together, so a board's 304 always comes with the ids it stands for
+            store.set_watermark(self.ids_key(boards[url]), json.dumps(self._board_ids[url], separators=(",", ":")))
+            store.set_validators(url, validators)
+        self._validators = {}
+        self._board_ids = {}
+
+def _single_board_source(ats):
+    """Source type for one board of ``ats``, configured by ``board`` and ``company``."""
+    class SingleBoardSource(BoardsSource):
+        def __init__(self, name, options):
+            board = options.get("board", name)
+            company = options.get("company", board.title())
+            super().__init__(name, {**options, "boards": f"{ats}:{board} = {company}", "company": company})
+    SingleBoardSource.__name__ = f"{ats.title()}Source"
+    return sources.register(ats)(SingleBoardSource)
+
+GreenhouseSource = _single_board_source("greenhouse")
+LeverSource = _single_board_source("lever")
+AshbySource = _single_board_source("ashby")
@@ -0,0 +1,110 @@
+"""Compare card extraction paths on captured result pages.
+
+    python bench_extraction.py --capture   # save live result pages to fixtures/<source>/
+    python bench_extraction.py             # benchmark on the saved pages
+
+For every fixture it times the offline parsers (html.parser, and lxml when
+installed) and, in Chromium, the old ``page.content()`` + BeautifulSoup path
+against the in-page selector script.
+"""
+import argparse
+import functools
+import glob
+import os
+import time
+from contextlib import aclosing
+import browser_pool
+import dom_extract
+import meta
+import microsoft
+import paginator
+
+print = functools.partial(print, flush=True)
+
+FIXTURES_DIR = "fixtures"
+CAPTURE_PAGES = 2
+
+SOURCES = {
+    "meta": (meta, lambda page_num: f"{meta.FILTERED_URL}&page={page_num}", meta.READY_SELECTOR),
+    "microsoft": (microsoft, lambda page_num: microsoft.BASE_URL.format(page=page_num), microsoft.READY_SELECTOR),
+}
+
+def load_fixtures(source):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, source, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    return fixtures
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+async def timed_async(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = await func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+async def capture():
+    async def content(tab):
+        return [await tab.content()]
+
+    for source, (_, url_for_page, ready_selector) in SOURCES.items():
+        os.makedirs(os.path.join(FIXTURES_DIR, source), exist_ok=True)
+        pages = paginator.prefetch_pages(source, url_for_page, ready_selector, content)
+        async with aclosing(pages):
+            async for page_num, html in pages:
+                if html:
+                    path = os.path.join(FIXTURES_DIR, source, f"page{page_num}.html")
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(html[0])
+                    print(f"💾 Saved {path}")
+                if page_num >= CAPTURE_PAGES:
+                    break
+
+async def benchmark(repeat):
+    parsers = ["html.parser"] + (["lxml"] if dom_extract.HTML_PARSER == "lxml" else [])
+    manager = browser_pool.get_manager()
+
+    for source, (module, _, _) in SOURCES.items():
+        fixtures = load_fixtures(source)
+        if not fixtures:
+            print(f"⚠️ No fixtures in {FIXTURES_DIR}/{source}/, run with --capture first.")
+            continue
+
+        for name, html in fixtures:
+            print(f"\n📄 {source}/{name} ({len(html) / 1024:.0f} KB)")
+
+            for parser in parsers:
+                dom_extract.HTML_PARSER = parser
+                ms, raw = timed(lambda: module.parse_raw_cards(html), repeat)
+                print(f"  offline {parser:<12} {ms:8.1f} ms  {len(raw)} cards")
+
+            async with manager.page() as tab:
+                await tab.setJavaScriptEnabled(False)  # keep the fixture's own scripts from running
+                await tab.setContent(html)
+                dom_extract.HTML_PARSER = "html.parser"
+                ms, raw = await timed_async(lambda: _content_and_parse(tab, module), repeat)
+                print(f"  browser content+bs4    {ms:8.1f} ms  {len(raw)} cards")
+                ms, raw = await timed_async(lambda: tab.evaluate(module.EXTRACT_CARDS_JS), repeat)
+                print(f"  browser in-page script {ms:8.1f} ms  {len(raw)} cards")
+
+async def _content_and_parse(tab, module):
+    return module.parse_raw_cards(await tab.content())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capture", action="store_true", help="save live result pages as fixtures")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    args = parser.parse_args()
+
+    if args.capture:
+        browser_pool.run(capture)
+    else:
+        browser_pool.run(lambda: benchmark(args.repeat))
+
+if __name__ == "__main__":
+    main()
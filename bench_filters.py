@@ -0,0 +1,74 @@
+"""Benchmark the compiled job filter on synthetic titles and locations.
+
+    python bench_filters.py              # 100k jobs
+    python bench_filters.py --jobs 500000
+
+Compares filters.JobFilter against the per-job approach it replaced
+(compile the title regex, scan the locations as substrings for every job).
+"""
+import argparse
+import functools
+import random
+import re
+import time
+import filters
+
+print = functools.partial(print, flush=True)
+
+LEVELS = ["", "", "", "Senior ", "Staff ", "Principal ", "Junior ", "Lead "]
+ROLES = ["Software Engineer", "Machine Learning Engineer", "Research Scientist", "Data Scientist",
+         "Product Manager", "Applied Scientist", "ML Engineer", "Research Engineer", "Recruiter",
+         "Account Executive", "Technical Program Manager", "Site Reliability Engineer", "Designer"]
+SUFFIXES = ["", "", ", Infrastructure", " - Ads", ", Generative AI", " (Intern)", ", Health", " II"]
+LOCATIONS = ["Toronto, ON, Canada", "Montréal, Quebec", "Vancouver, BC", "Zurich, Switzerland",
+             "Mountain View, California, US", "New York City, New York, US", "London, UK", "Remote",
+             "Paris, France", "Seattle, WA", "Bangalore, India", "Remote - Canada", "Sydney, Australia"]
+
+SPEC = filters.FilterSpec(
+    include=("machine learning engineer", "ml engineer", "research engineer", "software engineer",
+             "machine learning scientist", "research scientist", "applied scientist", "data scientist"),
+    exclude=("intern", "manager"),
+    seniority=("mid", "senior", "staff"),
+    locations=("canada", "remote", "Zurich, Switzerland"),
+    aliases={"canada": ("canada", "ontario", "quebec", "toronto", "montreal", "vancouver", "bc")},
+)
+
+def synthetic_jobs(count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.choice(LEVELS) + rng.choice(ROLES) + rng.choice(SUFFIXES), rng.choice(LOCATIONS))
+            for _ in range(count)]
+
+def naive_matches(title, location):
+    """Roughly what the scrapers did inline before filters.py."""
+    pattern = re.compile(r"\b(machine learning engineer|ml engineer|research engineer|software engineer|"
+                         r"machine learning scientist|research scientist|applied scientist|data scientist)\b",
+                         re.IGNORECASE)
+    if not pattern.search(title) or re.search(r"\b(intern|manager|principal|junior|lead)\b", title, re.IGNORECASE):
+        return False
+    return any(loc in location for loc in ["Canada", "Toronto", "Montréal", "Vancouver", "Remote", "Zurich, Switzerland"])
+
+def timed(label, func, jobs):
+    start = time.perf_counter()
+    matched = sum(1 for title, location in jobs if func(title, location))
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed * 1000:8.1f} ms  {len(jobs) / elapsed / 1000:8.0f}k jobs/s  {matched} matched")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    jobs = synthetic_jobs(args.jobs)
+    print(f"🧪 {len(jobs)} synthetic jobs")
+
+    start = time.perf_counter()
+    job_filter = filters.JobFilter(SPEC)
+    print(f"  {'compile':<22} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    naive = timed("per-job regex + scan", naive_matches, jobs)
+    compiled = timed("compiled filter", job_filter.matches, jobs)
+    print(f"  ⚡ {naive / compiled:.1f}x faster")
+
+if __name__ == "__main__":
+    main()
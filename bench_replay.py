@@ -0,0 +1,154 @@
+"""Benchmark every source, and one full pass over all of them, on recorded traffic.
+
+    python replay.py record                    # once, with network access
+    python bench_replay.py                     # wall time, jobs/sec and peak RSS per source
+    python bench_replay.py --save-baseline bench_baseline.json
+    python bench_replay.py --compare bench_baseline.json   # exit 1 on a regression
+    python -m pytest tests/test_bench_replay.py            # small committed recordings, fixed thresholds
+
+Requests go to a local stub serving fixtures/replay/ (see replay.py), every
+round starts from an empty seen store, and nothing is sent to Telegram or
+through TOR, so results only depend on this machine. Without recordings,
+or when a source finds no jobs in them, it fails instead of timing 404s.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import replay
+import settings
+
+print = functools.partial(print, flush=True)
+
+RSS_SAMPLE_INTERVAL = 0.2  # seconds
+
+class PeakRss:
+    """Samples the resident memory of this process and its children (Chromium) in the background."""
+
+    def __init__(self):
+        from memory_guard import process_tree_rss_mb
+        self._measure = process_tree_rss_mb
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._measure(os.getpid()))
+            self._stop.wait(RSS_SAMPLE_INTERVAL)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._measure(os.getpid()))
+
+def jobs_processed():
+    import sources
+    return sum(sources.JOBS.values.values())
+
+async def measure(label, run, rounds, workdir):
+    import seen_store
+    results = []
+    for round_num in range(rounds):
+        # An empty store every round, so every round does the same work
+        seen_store._store = seen_store.SeenStore(
+            os.path.join(workdir, f"{label}-{round_num}.db"), os.path.join(workdir, f"{label}-{round_num}.bloom")
+        )
+        jobs_before = jobs_processed()
+        with PeakRss() as rss:
+            start = time.perf_counter()
+            await run()
+            wall = time.perf_counter() - start
+        results.append((wall, jobs_processed() - jobs_before, rss.peak))
+
+    wall, jobs, _ = min(results, key=lambda result: result[0])
+    summary = {"wall_s": round(wall, 3), "jobs": jobs, "jobs_per_s": round(jobs / wall, 1) if wall else 0.0,
+               "peak_rss_mb": round(max(result[2] for result in results), 1)}
+    print(f"  {label:<12} {summary['wall_s']:8.2f}s {summary['jobs']:6d} jobs "
+          f"{summary['jobs_per_s']:9.1f} jobs/s {summary['peak_rss_mb']:8.0f} MB peak")
+    return summary
+
+async def benchmark(names, rounds, workdir):
+    import job_search_main
+    import sources
+
+    print(f"\n{'':2}{'source':<12} {'wall':>9} {'jobs':>11} {'throughput':>15} {'memory':>12}")
+    results = {}
+    for name in names:
+        results[name] = await measure(name, lambda: sources.run_source(sources.build_source(name)), rounds, workdir)
+    full_cycle = lambda: job_search_main.search_once([sources.build_source(name) for name in names])
+    results["full_cycle"] = await measure("full_cycle", full_cycle, rounds, workdir)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print regressions against a saved baseline; returns True if any."""
+    regressed = False
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key, worse_if_higher in (("wall_s", True), ("peak_rss_mb", True), ("jobs_per_s", False)):
+            before, after = previous.get(key), current.get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change > tolerance) if worse_if_higher else (change < -tolerance):
+                regressed = True
+                print(f"❌ {name} {key}: {before} -> {after} ({change:+.0%})", file=sys.stderr)
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="sources to benchmark (default: all enabled)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before failing")
+    parser.add_argument("--fixtures-dir", default=replay.FIXTURES_DIR, help="recordings to serve")
+    args = parser.parse_args()
+
+    try:
+        server, base_url = replay.start_stub(directory=args.fixtures_dir)
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
+    replay.STUB_URL = base_url
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+    # Before the scrapers are imported: they read these at import time
+    settings.config.read_dict({
+        "settings": {"notifications_enabled": "false"},
+        "seen_store": {"path": os.path.join(workdir, "outbox.db"), "bloom_path": os.path.join(workdir, "unused.bloom")},
+        "tor": {"sources": ""},
+        "metrics": {"port": "0", "trace_path": ""},
+        "history": {"path": os.path.join(workdir, "archive")},
+        "workers": {"queue_path": os.path.join(workdir, "work_queue.db")},
+    })
+    import browser_pool
+    import sources
+
+    names = args.sources or sources.enabled_source_names()
+    results = browser_pool.run(lambda: benchmark(names, args.rounds, workdir))
+    server.shutdown()
+    empty = [name for name in names if not results[name]["jobs"]]
+    if empty:
+        sys.exit(f"❌ No jobs found for {', '.join(empty)}: re-record them or check the parsers.")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+        print("✅ No regressions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import hashlib
+import math
+import os
+import struct
+
+HEADER = struct.Struct("<4sQIQ")  # magic, bit count, hash count, stored item count
+MAGIC = b"BLM1"
+
+class BloomFilter:
+    """Fixed-size Bloom filter with double hashing over a blake2b digest.
+
+    Memory is ``-capacity * ln(error_rate) / ln(2)^2`` bits no matter how many
+    keys are added; the false-positive rate only reaches ``error_rate`` once
+    ``capacity`` keys are in.
+    """
+
+    def __init__(self, capacity, error_rate, num_bits=None, num_hashes=None, bits=None, items=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = num_bits or max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.items = items
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.items += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def expected_fp_rate(self):
+        """Theoretical false-positive rate at the current fill level."""
+        return (1 - math.exp(-self.num_hashes * self.items / self.num_bits)) ** self.num_hashes
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.num_bits, self.num_hashes, self.items))
+            f.write(self.bits)
+        os.replace(tmp_path, path)  # never leave a half-written filter behind
+
+    @classmethod
+    def load(cls, path, capacity, error_rate):
+        """Load a saved filter; returns None if it is missing, corrupt or sized differently."""
+        try:
+            with open(path, "rb") as f:
+                magic, num_bits, num_hashes, items = HEADER.unpack(f.read(HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        expected = cls(capacity, error_rate)
+        if magic != MAGIC or (num_bits, num_hashes) != (expected.num_bits, expected.num_hashes):
+            return None
+        if len(bits) != (num_bits + 7) // 8:
+            return None
+        return cls(capacity, error_rate, num_bits, num_hashes, bits, items)
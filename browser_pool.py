@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import sys
+from contextlib import asynccontextmanager
+import memory_guard
+import metrics
+import replay
+import resource_filter
+import settings
+import tor_circuits
+
+print = functools.partial(print, flush=True)
+
+EXECUTABLE_PATH = settings.get('browser', 'executable_path', '/usr/bin/chromium-browser')
+POOL_SIZE = memory_guard.cap(settings.getint('browser', 'pool_size', 2), 1)
+MAX_RSS_MB = memory_guard.cap(settings.getint('browser', 'max_rss_mb', 600),
+                              settings.getint('memory', 'browser_max_rss_mb', 350))
+# Chromium can't authenticate to SOCKS, so all browser tabs share one set of TOR circuits.
+# A local replay stub is reached directly.
+PROXY = '' if replay.STUB_URL else settings.get('browser', 'proxy', '')
+LAUNCH_ARGS = ['--no-sandbox', '--disable-gpu'] + ([f'--proxy-server={PROXY}'] if PROXY else [])
+HEALTH_CHECK_TIMEOUT = 10  # seconds
+
+CHROMIUM_RSS = metrics.gauge("chromium_rss_megabytes", "Resident memory of the Chromium process tree")
+CHROMIUM_LAUNCHES = metrics.counter("chromium_launches_total", "Chromium launches, including relaunches and recycles")
+TABS_IN_USE = metrics.gauge("chromium_tabs_in_use", "Browser tabs currently borrowed by scrapers")
+
+# --- Shared Browser ---
+class BrowserManager:
+    """One long-lived headless Chromium that scrapers borrow tabs from.
+
+    The browser is launched lazily, health-checked on every borrow and
+    relaunched after a crash. When its process tree grows past
+    ``max_rss_mb``, or the memory monitor asks for it, it is recycled as
+    soon as no tab is in use.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, max_rss_mb=MAX_RSS_MB):
+        self.pool_size = pool_size
+        self.max_rss_mb = max_rss_mb
+        self.browser = None
+        self.launches = 0
+        self._idle_tabs = []
+        self._in_use = 0
+        self._recycle = False
+        self._slots = asyncio.Semaphore(pool_size)
+        self._lock = asyncio.Lock()
+
+    async def _launch(self):
+        from pyppeteer import launch  # slow to import, and only sources that render pages need it
+        self.browser = await launch({
+            'headless': True,
+            'executablePath': EXECUTABLE_PATH,
+            'args': LAUNCH_ARGS,
+            # The daemon owns the browser lifetime, not pyppeteer's signal handlers
+            'handleSIGINT': False,
+            'handleSIGTERM': False,
+            'handleSIGHUP': False,
+        })
+        self._idle_tabs = []
+        self._recycle = False
+        self.launches += 1
+        CHROMIUM_LAUNCHES.inc()
+        print(f"🌐 Chromium launched (launch #{self.launches}).")
+
+    async def _close_browser(self):
+        browser, self.browser = self.browser, None
+        self._idle_tabs = []
+        if browser is None:
+            return
+        try:
+            await browser.close()
+        except Exception as e:
+            print(f"❌ Error closing Chromium: {e}", file=sys.stderr)
+
+    async def is_healthy(self):
+        if self.browser is None:
+            return False
+        process = getattr(self.browser, 'process', None)
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            await asyncio.wait_for(self.browser.version(), HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        process = getattr(self.browser, 'process', None)
+        if process is None:
+            return 0.0
+        return memory_guard.process_tree_rss_mb(process.pid)
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if not await self.is_healthy():
+                if self.browser is not None:
+                    print("⚠️ Chromium is unresponsive, relaunching.", file=sys.stderr)
+                await self._close_browser()
+                await self._launch()
+            elif self._in_use == 0 and (self._recycle or self.rss_mb() > self.max_rss_mb):
+                print(f"♻️ Chromium is using {self.rss_mb():.0f} MB (limit {self.max_rss_mb} MB), recycling.")
+                await self._close_browser()
+                await self._launch()
+
+    async def relieve_pressure(self):
+        """Memory monitor callback: close Chromium if it is idle, else recycle it on the next borrow."""
+        if self.browser is None:
+            return
+        async with self._lock:
+            if self._in_use == 0:
+                print(f"♻️ Closing idle Chromium ({self.rss_mb():.0f} MB) to free memory; it relaunches when needed.")
+                await self._close_browser()
+            else:
+                self._recycle = True
+
+    async def _new_tab(self):
+        tab = await self.browser.newPage()
+        await resource_filter.install(tab)
+        return tab
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a tab; at most ``pool_size`` tabs are handed out at once."""
+        async with self._slots:
+            await self._ensure_browser()
+            generation = self.launches
+            tab = self._idle_tabs.pop() if self._idle_tabs else await self._new_tab()
+            self._in_use += 1
+            healthy = False
+            try:
+                yield tab
+                healthy = True
+            finally:
+                self._in_use -= 1
+                await self._release(tab, reuse=healthy and generation == self.launches)
+
+    async def _release(self, tab, reuse):
+        if reuse and not tab.isClosed():
+            try:
+                await tab.goto('about:blank')  # drop the old DOM before the tab idles
+                self._idle_tabs.append(tab)
+                return
+            except Exception:
+                pass
+        try:
+            await tab.close()
+        except Exception:
+            pass  # the tab or browser is already gone
+
+    async def close(self):
+        async with self._lock:
+            await self._close_browser()
+
+def report_block(reason):
+    """Rotate the browser's TOR circuits after a block signal (no-op without a proxy)."""
+    if PROXY:
+        # Talking to the control port blocks, keep it off the event loop
+        asyncio.get_running_loop().run_in_executor(None, tor_circuits.get_manager().report_block, None, reason)
+
+def record_load(latency, ok):
+    """Feed a page load into the browser circuit's latency/failure stats (no-op without a proxy)."""
+    if PROXY:
+        asyncio.get_running_loop().run_in_executor(None, tor_circuits.get_manager().record, None, latency, ok)
+
+_manager = None
+
+@metrics.on_collect
+def _collect():
+    if _manager is not None:
+        CHROMIUM_RSS.set(round(_manager.rss_mb(), 1))
+        TABS_IN_USE.set(_manager._in_use)
+
+def get_manager():
+    global _manager
+    if _manager is None:
+        _manager = BrowserManager()
+        memory_guard.get_monitor().on_pressure(_manager.relieve_pressure)
+    return _manager
+
+async def shutdown():
+    if _manager is not None:
+        await _manager.close()
+
+def run(main):
+    """Run a scraper coroutine standalone, close the shared browser afterwards and return its result."""
+    async def runner():
+        try:
+            return await main()
+        finally:
+            await shutdown()
+    return asyncio.run(runner())
@@ -0,0 +1,62 @@
+import functools
+import sys
+import time
+from contextlib import contextmanager
+from bs4 import BeautifulSoup
+import metrics
+import settings
+
+print = functools.partial(print, flush=True)
+
+# "script" pulls card fields out with an in-page selector script, "html" serializes
+# the whole DOM and parses it in Python (slower, but independent of the page's JS engine)
+EXTRACTION_MODE = settings.get('extraction', 'mode', 'script')
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+PARSE_SECONDS = metrics.histogram("extract_seconds", "Time to pull job cards out of a loaded page, by method")
+
+def make_soup(content):
+    """Parse saved or serialized HTML with the fastest parser installed."""
+    return BeautifulSoup(content, HTML_PARSER)
+
+@contextmanager
+def parsed(content):
+    """``make_soup(content)`` whose tree is torn down on exit.
+
+    A BeautifulSoup tree is full of reference cycles, so without
+    ``decompose()`` a whole page stays in memory until the next GC pass.
+    Copy what you need out of it as plain strings before leaving the block.
+    """
+    soup = make_soup(content)
+    try:
+        yield soup
+    finally:
+        soup.decompose()
+
+async def extract(page, script, parse_html):
+    """Return raw card dicts from a loaded page.
+
+    ``script`` is a JS function evaluated in the page that returns a JSON list;
+    ``parse_html`` turns serialized HTML into the same list and is used in
+    "html" mode or when the script fails.
+    """
+    if EXTRACTION_MODE == "script":
+        start = time.monotonic()
+        try:
+            cards = await page.evaluate(script)
+            PARSE_SECONDS.observe(time.monotonic() - start, method="script")
+            return cards
+        except Exception as e:
+            print(f"⚠️ In-page extraction failed, parsing HTML instead: {e}", file=sys.stderr)
+    start = time.monotonic()
+    content = await page.content()
+    serialized = time.monotonic()
+    cards = parse_html(content)
+    PARSE_SECONDS.observe(serialized - start, method="serialize")
+    PARSE_SECONDS.observe(time.monotonic() - serialized, method=HTML_PARSER)
+    return cards
@@ -0,0 +1,197 @@
+import functools
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import settings
+
+# --- Spec ---
+# Seniority levels recognised in titles; a title with none of them counts as "mid"
+SENIORITY_TERMS = {
+    "intern": ["intern", "internship", "co-op", "coop", "student"],
+    "junior": ["junior", "jr", "entry level", "entry-level", "new grad", "graduate"],
+    "senior": ["senior", "sr"],
+    "staff": ["staff"],
+    "principal": ["principal", "distinguished"],
+    "lead": ["lead", "head of"],
+    "manager": ["manager", "director", "vp", "vice president"],
+}
+POSTED_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d")
+LOCATION_CACHE_SIZE = 8192  # distinct location strings remembered per filter
+
+@dataclass
+class FilterSpec:
+    """What a job has to look like to be announced; empty fields don't filter."""
+    include: Tuple[str, ...] = ()  # title keywords/phrases, any of them
+    exclude: Tuple[str, ...] = ()  # title keywords/phrases, none of them
+    title_pattern: Optional[str] = None  # extra raw regex a title may match instead of ``include``
+    locations: Tuple[str, ...] = ()  # places or alias groups from [location_aliases], any of them
+    seniority: Tuple[str, ...] = ()  # allowed levels from SENIORITY_TERMS, plus "mid"
+    max_age_days: int = 0
+    aliases: dict = field(default_factory=dict)  # alias group -> its spellings
+
+def _split(value):
+    return tuple(part.strip() for part in re.split(r"[,\n]", value or "") if part.strip())
+
+def _lines(value):
+    # Places contain commas ("Mountain View, California, US"), so each line is one place
+    return tuple(line.strip() for line in (value or "").splitlines() if line.strip())
+
+def load_aliases():
+    if not settings.config.has_section('location_aliases'):
+        return {}
+    return {group: _split(spellings) for group, spellings in settings.config['location_aliases'].items()}
+
+def spec_from_options(options=None):
+    """Build a spec from ``[filters]``, overridden by the same keys in ``options`` (a source's section)."""
+    def get(key, fallback=""):
+        if options is not None and key in options:
+            return options[key]
+        return settings.get('filters', key, fallback)
+
+    max_age = get("max_age_days", "0")
+    return FilterSpec(
+        include=_split(get("include")),
+        exclude=_split(get("exclude")),
+        title_pattern=get("title_pattern") or None,
+        locations=_lines(get("locations")),
+        seniority=tuple(level.lower() for level in _split(get("seniority"))),
+        max_age_days=int(max_age) if max_age.strip().isdigit() else 0,
+        aliases=load_aliases(),
+    )
+
+# --- Compilation ---
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+_SEPARATOR = r"[^a-z0-9+#]+"
+
+def fold(text):
+    """Lowercase and, for non-ASCII text only, strip accents: "Montréal" -> "montreal"."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def normalize(text):
+    """fold() and drop punctuation: "Montréal, QC" -> "montreal qc"."""
+    return " ".join(_TOKEN.findall(fold(text)))
+
+def _trie_pattern(terms):
+    """One regex alternation for many terms, factored on common prefixes.
+
+    Factoring keeps the regex engine from retrying every term at every
+    position, which is what makes a long flat ``a|b|c`` alternation slow.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for token in normalize(term).split():
+            node = node.setdefault(token, {})
+        node[""] = {}
+
+    def build_node(node):
+        alternatives = []
+        for token, child in sorted(node.items(), key=lambda item: -len(item[0])):
+            if not token:
+                continue
+            rest = build_node(child)
+            if rest is None:
+                alternatives.append(re.escape(token))
+            elif "" in child:
+                alternatives.append(re.escape(token) + "(?:" + _SEPARATOR + rest + ")?")
+            else:
+                alternatives.append(re.escape(token) + _SEPARATOR + rest)
+        if not alternatives:
+            return None
+        return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+    body = build_node(trie)
+    return None if body is None else r"(?<![a-z0-9])" + body + r"(?![a-z0-9])"
+
+class LocationIndex:
+    """Maps normalized place phrases to the alias group (or wanted place) they belong to."""
+
+    def __init__(self, wanted, aliases):
+        self.phrases = {}
+        groups = {normalize(group): spellings for group, spellings in aliases.items()}
+        for place in wanted:
+            key = normalize(place)
+            self.phrases[tuple(key.split())] = key
+            for spelling in groups.get(key, ()):
+                self.phrases[tuple(normalize(spelling).split())] = key
+        self.max_len = max((len(phrase) for phrase in self.phrases), default=0)
+
+    def match(self, location):
+        tokens = normalize(location).split()
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(start + self.max_len, len(tokens)) + 1):
+                if tuple(tokens[start:end]) in self.phrases:
+                    return True
+        return False
+
+class JobFilter:
+    """A FilterSpec compiled once: an include, a reject and a seniority regex plus a location index.
+
+    Titles are matched after ``fold``, with any run of punctuation or spaces
+    between words, so "Sr. Machine-Learning Engineer" and "sr machine
+    learning engineer" are the same to the keyword lists.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        include = _trie_pattern(spec.include)
+        self.include = re.compile(include) if include else None
+        self.title_pattern = re.compile(spec.title_pattern, re.IGNORECASE) if spec.title_pattern else None
+        # Excluded keywords and the terms of every level that isn't allowed share one regex
+        rejected = list(spec.exclude)
+        required_levels = None
+        if spec.seniority:
+            allowed = set(spec.seniority)
+            for level, terms in SENIORITY_TERMS.items():
+                if level not in allowed:
+                    rejected.extend(terms)
+            if "mid" not in allowed:
+                # Unmarked titles are "mid", so a marker of an allowed level becomes mandatory
+                required_levels = _trie_pattern([term for level in allowed for term in SENIORITY_TERMS.get(level, ())])
+        reject = _trie_pattern(rejected)
+        self.reject = re.compile(reject) if reject else None
+        self.required_level = re.compile(required_levels) if required_levels else None
+
+        self.location_index = LocationIndex(spec.locations, spec.aliases) if spec.locations else None
+        if self.location_index is not None:
+            # Boards repeat the same few location strings, so their lookups are cached
+            self.location_matches = functools.lru_cache(maxsize=LOCATION_CACHE_SIZE)(self.location_index.match)
+        self.max_age = timedelta(days=spec.max_age_days) if spec.max_age_days > 0 else None
+
+    def matches_title(self, title):
+        normalized = fold(title)
+        if self.include is not None or self.title_pattern is not None:
+            if not ((self.include is not None and self.include.search(normalized))
+                    or (self.title_pattern is not None and self.title_pattern.search(title))):
+                return False
+        if self.reject is not None and self.reject.search(normalized):
+            return False
+        if self.required_level is not None and not self.required_level.search(normalized):
+            return False
+        return True
+
+    def matches_location(self, location):
+        return self.location_index is None or self.location_matches(location or "")
+
+    def is_recent(self, posted):
+        if self.max_age is None or not posted:
+            return True
+        for fmt in POSTED_FORMATS:
+            try:
+                return datetime.now() - datetime.strptime(posted, fmt) <= self.max_age
+            except ValueError:
+                continue
+        return True  # an unknown date is not a reason to miss a job
+
+    def matches(self, title, location, posted=None):
+        # Cheapest first: locations repeat, so their lookup is usually a cache hit
+        return bool(title) and self.matches_location(location) and self.matches_title(title) and self.is_recent(posted)
+
+def compile_filter(options=None):
+    return JobFilter(spec_from_options(options))
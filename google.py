@@ -1,17 +1,42 @@
-import requests
-import time
+import asyncio
+import http_client
 from datetime import datetime
-import telegram as tel
+import high_water
+import job_identity
+import seen_store
+import sources
 import functools
 
 print = functools.partial(print, flush=True)
 SEARCH_TERM = "ai"
 LOCATION = "Canada"
-INTERVAL = 600  # in seconds (10 minutes)
-SEEN_FILE = "seen_jobs_google.txt"
-
-def get_jobs_request(url, page = None):
-    response = requests.get(url)
+SOURCE = "google"
+BASE_URL = "https://careers.google.com/api/v3/search/"
+# Other fields of an API result kept in the history archive
+DETAIL_FIELDS = ("company_name", "categories", "education_levels", "publish_date", "modified")
+
+def job_details(job):
+    details = {}
+    for key in DETAIL_FIELDS:
+        value = job.get(key)
+        if value:
+            details[key] = value if isinstance(value, str) else "; ".join(map(str, value))
+    locations = [location.get("display") for location in job.get("locations") or [] if location.get("display")]
+    if len(locations) > 1:
+        details["locations"] = "; ".join(locations)
+    return details
+
+def get_jobs_request(url, page = None, validators = None, source = None):
+    """Fetch a page of jobs; returns [] past the last page and None if it is unchanged or failed.
+
+    If ``validators`` (a dict from ``SeenStore.get_validators``) is given, its
+    ETag/Last-Modified are sent as conditional headers and replaced in place by
+    the response's, so the caller can save them once the jobs are processed.
+    """
+    response = http_client.conditional_get(url, validators, source=source)
+    if response is None:
+        print(f"[✓] Not modified since last check{f' (page {page})' if page is not None else ''}.")
+        return None
     if response.status_code != 200:
         print(f"❌ Error fetching{f' page {page}' if page is not None else ''}: {response.status_code}")
         return None
@@ -21,82 +46,97 @@ def get_jobs_request(url, page = None):
 
     if not jobs:
         print(f"[✓] No more jobs on page {f' page {page}' if page is not None else ''}. Stopping.")
-        return None
     return jobs
 
-def load_seen_jobs(SEEN_FILE):
-    try:
-        with open(SEEN_FILE, "r") as f:
-            return [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        return []
-
-def save_seen_jobs(SEEN_FILE, seen_jobs):
-    # Sort by datetime extracted from job_key (title::timestamp)
-    seen_jobs = sorted(seen_jobs, key=lambda x: x.split("::")[-1])
-    with open(SEEN_FILE, "w") as f:
-        for job in seen_jobs:
-            f.write(job + "\n")
-
-def notify_job(company, title, location, created_date, job_url):
-    tel.send_notification(f"\n🔔 {company} Job: {title} [{location}] \n🕒 Oppened: {created_date}\n🔗 URL: {job_url}")
-
-def main():
-    seen_jobs = load_seen_jobs(SEEN_FILE)
-    updated_jobs = fetch_all_jobs(seen_jobs)
-    save_seen_jobs(SEEN_FILE, updated_jobs)
-
-def fetch_all_jobs(seen_jobs):
-    base_url = "https://careers.google.com/api/v3/search/"
-    page = 1
-    new_jobs = []
-
-    seen_set = set(seen_jobs)
-
-    while True:
-        url = (
-            f"{base_url}?q={SEARCH_TERM.replace(' ', '+')}"
-            f"&location={LOCATION}&page={page}"
+@sources.register("google")
+class GoogleCareersSource:
+    """Google careers search API, newest postings first."""
+
+    quiet_first_run = False
+
+    def __init__(self, name, options):
+        self.name = name
+        self.company = options.get("company", "Google")
+        self.search_term = options.get("search_term", SEARCH_TERM)
+        self.location = options.get("location", LOCATION)
+        self.options = options
+        self._mark = None
+        self._validators = {}
+
+    def page_url(self, page):
+        return (
+            f"{BASE_URL}?q={self.search_term.replace(' ', '+')}"
+            f"&location={self.location}&sort_by=date&page={page}"
         )
 
-        jobs = get_jobs_request(url, page = page)
-        if jobs is None:
-            break
-
-        for job in jobs:
-            title = job.get("title", "")
-            apply_url = job.get("apply_url", "")
-            location = job.get("locations", [{}])[0].get("display", "Unknown Location")
-
-            created_raw = job.get("created", "")
-            created = "Unknown"
-            if created_raw:
-                try:
-                    created = datetime.fromisoformat(
-                        created_raw.replace("Z", "+00:00")
-                    ).strftime("%Y-%m-%d %H:%M")
-                except Exception:
-                    print(f"⚠️ Could not parse created date: {created_raw}")
-
-            job_key = f"{title}::{created}"
-
-            if job_key in seen_set:
-                continue
-            print(job_key)
-
-            notify_job("Google", title, location, created, apply_url)
-            new_jobs.append(job_key)
-            seen_set.add(job_key)
+    def record(self, job):
+        title = job.get("title", "")
+        apply_url = job.get("apply_url", "")
+        location = job.get("locations", [{}])[0].get("display", "Unknown Location")
+
+        created_raw = job.get("created", "")
+        created = "Unknown"
+        if created_raw:
+            try:
+                created = datetime.fromisoformat(created_raw.replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M")
+            except Exception:
+                print(f"⚠️ Could not parse created date: {created_raw}")
+
+        legacy_key = f"{title}::{created}"
+        return sources.JobRecord(
+            source=self.name,
+            job_id=job_identity.canonical_id(job.get("id"), apply_url, fallback=legacy_key),
+            company=self.company,
+            title=title,
+            location=location,
+            url=apply_url,
+            posted=created,
+            aliases=(legacy_key,),
+            details=job_details(job),
+        )
 
-        page += 1
+    async def fetch(self):
+        store = seen_store.get_store()
+        page = 1
+        self.complete = False
+        self._validators = {}
+        # sort_by=date: once a page only lists known postings, the pages after it are known too
+        self._mark = mark = high_water.HighWaterMark.from_options(self.name, self.options, store=store)
+        if mark.full_sweep:
+            print("Google: full sweep of every result page.")
+
+        while True:
+            url = self.page_url(page)
+            # A full sweep downloads every page: a 304 would end it without listing the rest
+            validators = {} if mark.full_sweep else store.get_validators(url)
+            jobs = await asyncio.to_thread(get_jobs_request, url, page, validators, self.name)
+            if not jobs:
+                # Only paging to the end, with no page unchanged or failed, lists every posting
+                self.complete = jobs is not None and page > 1
+                break
+            self._validators[url] = validators
+
+            # Checked before the records are yielded, since storing them makes them known
+            records = [self.record(job) for job in jobs]
+            more = mark.check_page(records)
+            for record in records:
+                yield record
+            if not more:
+                break
+
+            page += 1
+
+    async def commit(self):
+        store = seen_store.get_store()
+        for url, validators in self._validators.items():
+            store.set_validators(url, validators)
+        self._validators = {}
+        if self._mark is not None:
+            self._mark.save(reached_end=self.complete)
+            self._mark = None
 
-    return seen_jobs + new_jobs  # combine existing and new
+def main():
+    return sources.run_once(SOURCE)
 
 if __name__ == "__main__":
-    while True:
-        print("\n🔍 Checking for jobs...")
-
-        main()
-
-        print(f"\n[⏳] Sleeping for {INTERVAL//60} minutes...\n")
-        time.sleep(INTERVAL)
+    sources.poll_forever(SOURCE)
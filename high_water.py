@@ -0,0 +1,96 @@
+import functools
+import json
+import re
+from datetime import datetime, timedelta
+import metrics
+import seen_store
+import settings
+
+print = functools.partial(print, flush=True)
+
+# Newest-first listings (Meta, Microsoft) stop paging once a page only lists known postings
+LOOKAHEAD_PAGES = settings.getint('pagination', 'lookahead_pages', 0)  # known pages read past the first one
+FULL_SWEEP_HOURS = settings.getfloat('pagination', 'full_sweep_hours', 24)  # 0 pages to the end every time
+MAX_KNOWN_IDS = 5000  # job ids kept per source, newest first
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+LISTING_PAGES = metrics.histogram("listing_pages", "Result pages fetched per run of a newest-first source",
+                                  metrics.COUNT_BUCKETS)
+
+class HighWaterMark:
+    """Where a newest-first listing left off: the job ids it listed, newest first, and its newest posting date.
+
+    ``check_page()`` is given each page's records before they are yielded; a
+    page counts as known when every posting on it is in the mark, in the
+    seen store or dated before the newest date. Paging stops after
+    ``lookahead`` more known pages, which catches pinned and out-of-order
+    postings. Without a mark, or ``full_sweep_hours`` after the last run
+    that paged to the end, the run is a full sweep and never stops early,
+    so the source can report a complete listing. ``save()`` belongs in the
+    source's ``commit()``.
+    """
+
+    def __init__(self, source, lookahead=LOOKAHEAD_PAGES, full_sweep_hours=FULL_SWEEP_HOURS, store=None):
+        self.source = source
+        self.lookahead = lookahead
+        self.store = store or seen_store.get_store()
+        self.key = f"{source}:head"
+        state = json.loads(self.store.get_watermark(self.key) or "{}")
+        self.known_ids = state.get("ids", [])
+        self._known = set(self.known_ids)
+        self.newest = state.get("newest")
+        self.last_sweep = state.get("full_sweep")
+        sweep_due = (not full_sweep_hours or self.last_sweep is None
+                     or datetime.fromisoformat(self.last_sweep) < datetime.now() - timedelta(hours=full_sweep_hours))
+        self.full_sweep = not self.known_ids or sweep_due
+        self.stopped_early = False
+        self.pages = 0
+        self._known_pages = 0
+        self._listed = []
+        self._newest_listed = self.newest
+
+    @classmethod
+    def from_options(cls, source, options, store=None):
+        return cls(
+            source,
+            lookahead=int(options.get("lookahead_pages", LOOKAHEAD_PAGES)),
+            full_sweep_hours=float(options.get("full_sweep_hours", FULL_SWEEP_HOURS)),
+            store=store,
+        )
+
+    def is_known(self, record):
+        if record.job_id in self._known or self.store.contains(self.source, record.job_id):
+            return True
+        posted = record.posted if record.posted and ISO_DATE.match(record.posted) else None
+        return posted is not None and self.newest is not None and posted < self.newest
+
+    def check_page(self, records):
+        """Note one page of records; returns False once paging can stop after it."""
+        self.pages += 1
+        known = bool(records) and all(self.is_known(record) for record in records)
+        for record in records:
+            self._listed.append(record.job_id)
+            if record.posted and ISO_DATE.match(record.posted):
+                self._newest_listed = max(self._newest_listed or record.posted, record.posted)
+        if self.full_sweep:
+            return True
+        self._known_pages = self._known_pages + 1 if known else 0
+        if self._known_pages > self.lookahead:
+            self.stopped_early = True
+            print(f"[✓] {self.source}: page {self.pages} only lists known postings"
+                  f"{f' (and {self.lookahead} before it)' if self.lookahead else ''}. Stopping.")
+            return False
+        return True
+
+    def save(self, reached_end=False):
+        """Persist the mark; ``reached_end`` if the run paged to the end of the listing."""
+        LISTING_PAGES.observe(self.pages, source=self.source, sweep="full" if self.full_sweep else "incremental")
+        listed = list(dict.fromkeys(self._listed))
+        if self.full_sweep and reached_end:
+            # A full listing replaces the mark, which drops closed postings
+            ids, self.last_sweep = listed, datetime.now().isoformat(timespec="seconds")
+        else:
+            listed_set = set(listed)
+            ids = listed + [job_id for job_id in self.known_ids if job_id not in listed_set]
+        state = {"ids": ids[:MAX_KNOWN_IDS], "newest": self._newest_listed, "full_sweep": self.last_sweep}
+        self.store.set_watermark(self.key, json.dumps(state, separators=(",", ":")))
@@ -0,0 +1,246 @@
+"""Append-only archive of every posting each source listed, and of what changed.
+
+    python history.py changes [--source meta] [--days 7]   # added, changed and removed postings
+    python history.py open [--source meta]                 # postings open as of the last cycle
+    python history.py compact                              # merge finished days into one file per kind
+
+Every cycle that lists something new, changed or gone writes two batches
+under ``<path>/source=<name>/day=<YYYY-MM-DD>/``: ``snapshot-*`` with every
+posting of the cycle and ``changes-*`` with the diff against the previous
+cycle. With pyarrow installed they are zstd-compressed Parquet files (and
+the tree is a Hive-partitioned dataset for pyarrow/DuckDB), otherwise
+gzip-compressed JSON holding one list per column.
+
+The diff runs against the ``current_postings`` table in the seen-jobs
+database, so closed postings are found with an index lookup rather than by
+reading old snapshots. A posting only counts as removed after a cycle in
+which the source listed everything (``complete``); incremental fetches
+(conditional GETs, watermarks) only add and change. Boards that answered
+304 Not Modified count as listed, by the ids they had last time.
+"""
+import argparse
+import functools
+import glob
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import metrics
+import seen_store
+import settings
+
+print = functools.partial(print, flush=True)
+
+ENABLED = settings.getboolean('history', 'enabled', True)
+ARCHIVE_DIR = settings.get('history', 'path', 'archive')
+HISTORY_DB = seen_store.DB_FILE
+COLUMNS = ("run_ts", "source", "job_id", "company", "title", "location", "url", "posted", "details", "content_hash")
+CHANGE_COLUMNS = ("change",) + COLUMNS
+# Optional: Parquet batches instead of gzip'd JSON. Imported on first use, it takes seconds to load on a Pi
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+EXTENSION = ".parquet" if HAVE_PYARROW else ".json.gz"
+
+CHANGES = metrics.counter("history_changes_total", "Postings added, changed and removed between cycles")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS current_postings (
+    source       TEXT NOT NULL,
+    job_id       TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    company      TEXT,
+    title        TEXT,
+    location     TEXT,
+    url          TEXT,
+    posted       TEXT,
+    details      TEXT,
+    first_seen   TEXT NOT NULL,
+    last_seen    TEXT NOT NULL,
+    PRIMARY KEY (source, job_id)
+);
+CREATE INDEX IF NOT EXISTS idx_current_postings_last_seen ON current_postings (source, last_seen);
+"""
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+# --- Batch files ---
+def partition_dir(source, day):
+    return os.path.join(ARCHIVE_DIR, f"source={source}", f"day={day}")
+
+def write_batch(kind, source, run_ts, columns):
+    """Write one batch (``{column: values}``) for ``source``; returns its path."""
+    directory = partition_dir(source, run_ts[:10])
+    os.makedirs(directory, exist_ok=True)
+    # The pid keeps workers on one node from colliding within the same second
+    path = os.path.join(directory, f"{kind}-{run_ts[11:23].replace(':', '').replace('.', '')}-{os.getpid()}{EXTENSION}")
+    _write_file(path, columns)
+    return path
+
+def _write_file(path, columns):
+    tmp_path = path + ".tmp"
+    if HAVE_PYARROW:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(columns), tmp_path, compression="zstd")
+    else:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"columns": columns}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)  # readers never see half a batch
+
+def read_batch(path, columns=None):
+    """``{column: values}`` of one batch file, in either format."""
+    if path.endswith(".parquet"):
+        if not HAVE_PYARROW:
+            raise RuntimeError(f"pyarrow is needed to read {path}")
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=list(columns) if columns else None).to_pydict()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)["columns"]
+    return {name: data[name] for name in columns} if columns else data
+
+def batch_paths(kind, source=None, since=None):
+    """Batch files of ``kind``, oldest first; partitions are pruned by path before anything is opened."""
+    pattern = os.path.join(ARCHIVE_DIR, f"source={source or '*'}", "day=*", f"{kind}-*")
+    paths = []
+    for path in glob.glob(pattern):
+        day = os.path.basename(os.path.dirname(path))[len("day="):]
+        if (since is None or day >= since) and not path.endswith(".tmp"):
+            paths.append(path)
+    return sorted(paths, key=lambda path: (os.path.basename(os.path.dirname(path)), os.path.basename(path)))
+
+def iter_rows(kind, source=None, since=None, columns=None):
+    for path in batch_paths(kind, source, since):
+        data = read_batch(path, columns)
+        names = list(data)
+        yield from (dict(zip(names, values)) for values in zip(*data.values()))
+
+# --- Cycle diff ---
+def content_hash(record):
+    text = "\0".join((record.company or "", record.title or "", record.location or "", record.url or "",
+                      record.posted or "", json.dumps(record.details or {}, sort_keys=True)))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def _row(run_ts, source, record):
+    return (run_ts, source, record.job_id, record.company, record.title, record.location, record.url,
+            record.posted, json.dumps(record.details or {}, sort_keys=True), content_hash(record))
+
+def _columns(names, rows):
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+def record_cycle(source, records, complete, run_ts=None, still_listed=()):
+    """Diff a cycle's postings against the previous ones, archive both and return ``{change: count}``.
+
+    ``still_listed`` are ids of postings listed in parts of the listing that
+    weren't downloaded again (304 Not Modified): they count as seen this
+    cycle, so a complete cycle doesn't close them.
+    """
+    if not ENABLED:
+        return {}
+    # Milliseconds, so a posting last seen by the previous cycle is always older than this one
+    run_ts = run_ts or datetime.now().isoformat(timespec="milliseconds")
+    rows = {}
+    for record in records:
+        rows.setdefault(record.job_id, _row(run_ts, source, record))
+
+    conn = _connect()
+    with conn:
+        previous = dict(conn.execute("SELECT job_id, content_hash FROM current_postings WHERE source = ?", (source,)))
+        changes = []
+        for job_id, row in rows.items():
+            if job_id not in previous:
+                changes.append(("added",) + row)
+            elif previous[job_id] != row[-1]:
+                changes.append(("changed",) + row)
+        conn.executemany(
+            "INSERT INTO current_postings (source, job_id, content_hash, company, title, location, url, posted, "
+            "details, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(source, job_id) DO UPDATE SET content_hash = excluded.content_hash, "
+            "company = excluded.company, title = excluded.title, location = excluded.location, url = excluded.url, "
+            "posted = excluded.posted, details = excluded.details, last_seen = excluded.last_seen",
+            [(source, row[2], row[9], *row[3:9], run_ts, run_ts) for row in rows.values()],
+        )
+        conn.executemany("UPDATE current_postings SET last_seen = ? WHERE source = ? AND job_id = ?",
+                         [(run_ts, source, job_id) for job_id in still_listed if job_id not in rows])
+        if complete:
+            # Whatever a full listing no longer has was closed; the last_seen index finds it directly
+            closed = conn.execute(
+                "SELECT job_id, company, title, location, url, posted, details, content_hash "
+                "FROM current_postings WHERE source = ? AND last_seen < ?", (source, run_ts),
+            ).fetchall()
+            changes.extend(("removed", run_ts, source) + tuple(row) for row in closed)
+            conn.execute("DELETE FROM current_postings WHERE source = ? AND last_seen < ?", (source, run_ts))
+
+    counts = {}
+    for change in changes:
+        counts[change[0]] = counts.get(change[0], 0) + 1
+    if changes:
+        # An unchanged cycle adds nothing: the latest snapshot still describes the listing
+        write_batch("snapshot", source, run_ts, _columns(COLUMNS, list(rows.values())))
+        write_batch("changes", source, run_ts, _columns(CHANGE_COLUMNS, changes))
+        for change, count in counts.items():
+            CHANGES.inc(count, source=source, change=change)
+        print(f"🗄 {source}: " + ", ".join(f"{count} {change}" for change, count in sorted(counts.items()))
+              + f" ({len(rows)} listed{'' if complete else ', partial listing'}).")
+    return counts
+
+# --- Maintenance ---
+def compact(before=None):
+    """Merge each day's batches into one file per kind, for days before ``before`` (default: today)."""
+    before = before or datetime.now().date().isoformat()
+    merged = 0
+    for directory in sorted(glob.glob(os.path.join(ARCHIVE_DIR, "source=*", "day=*"))):
+        if os.path.basename(directory)[len("day="):] >= before:
+            continue
+        for kind, names in (("snapshot", COLUMNS), ("changes", CHANGE_COLUMNS)):
+            paths = sorted(path for path in glob.glob(os.path.join(directory, f"{kind}-*")) if not path.endswith(".tmp"))
+            if len(paths) < 2:
+                continue
+            columns = {name: [] for name in names}
+            for path in paths:
+                for name, values in read_batch(path, names).items():
+                    columns[name].extend(values)
+            merged_path = os.path.join(directory, f"{kind}-000000000-day{EXTENSION}")
+            # The batches are only removed once the merged file is in place, so a crash loses nothing
+            _write_file(merged_path, columns)
+            for path in paths:
+                if path != merged_path:
+                    os.remove(path)
+            merged += len(paths)
+    print(f"🗜 Merged {merged} batch files.")
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["changes", "open", "compact"])
+    parser.add_argument("--source")
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.command == "changes":
+        since = (datetime.now() - timedelta(days=args.days)).date().isoformat()
+        for row in iter_rows("changes", args.source, since, ("run_ts", "source", "change", "title", "location", "url")):
+            print(f"{row['run_ts']}  {row['source']:<10} {row['change']:<8} {row['title']} — {row['location']}  {row['url']}")
+    elif args.command == "open":
+        query = "SELECT source, first_seen, title, location, url FROM current_postings"
+        params = ()
+        if args.source:
+            query, params = query + " WHERE source = ?", (args.source,)
+        for source, first_seen, title, location, url in _connect().execute(query + " ORDER BY source, first_seen", params):
+            print(f"{first_seen}  {source:<10} {title} — {location}  {url}")
+    else:
+        compact()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+import replay
+import settings
+import tor_circuits
+
+print = functools.partial(print, flush=True)
+
+TOR_PROXY = settings.get('http', 'tor_proxy', 'socks5h://127.0.0.1:9050')
+CONNECT_TIMEOUT = settings.getfloat('http', 'connect_timeout', 10)
+READ_TIMEOUT = settings.getfloat('http', 'read_timeout', 30)
+MAX_RETRIES = settings.getint('http', 'max_retries', 3)
+BACKOFF_BASE = settings.getfloat('http', 'backoff_base', 1.0)  # seconds
+BACKOFF_MAX = settings.getfloat('http', 'backoff_max', 60.0)  # seconds
+PER_HOST_CONCURRENCY = settings.getint('http', 'per_host_concurrency', 4)
+# Per-host overrides, e.g. for the ATS APIs that serve hundreds of boards from one host
+HOST_CONCURRENCY = {
+    host: settings.getint('http_hosts', host, PER_HOST_CONCURRENCY)
+    for host in (settings.config['http_hosts'] if settings.config.has_section('http_hosts') else ())
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Mozilla/5.0 (X11; Linux aarch64) JobSearchNotif"
+
+HTTP_SECONDS = metrics.histogram("http_request_seconds", "requests-based HTTP latency by host")
+HTTP_RESPONSES = metrics.counter("http_responses_total", "HTTP responses (or connection errors) by host and status")
+HTTP_BYTES = metrics.counter("http_response_bytes_total", "HTTP response body bytes by host")
+
+_sessions = {}
+_source_sessions = {}
+_host_slots = {}
+_lock = threading.Lock()
+
+def _new_session(proxy=None):
+    session = requests.Session()
+    # One pool per host, as large as the number of requests we allow in parallel
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(PER_HOST_CONCURRENCY, *HOST_CONCURRENCY.values()),
+                          max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    if proxy:
+        session.proxies = {"http": proxy, "https": proxy}
+    return session
+
+def get_session(via_tor=False):
+    """Return the shared keep-alive session for direct or TOR traffic."""
+    with _lock:
+        session = _sessions.get(via_tor)
+        if session is None:
+            session = _sessions[via_tor] = _new_session(TOR_PROXY if via_tor else None)
+        return session
+
+def get_source_session(source):
+    """Session on ``source``'s own isolated TOR circuit; replaced whenever the circuit rotates."""
+    proxy = tor_circuits.get_manager().proxy_url(source)
+    with _lock:
+        current = _source_sessions.get(source)
+        if current is not None and current[0] == proxy:
+            return current[1]
+        if current is not None:
+            current[1].close()
+        session = _new_session(proxy)
+        _source_sessions[source] = (proxy, session)
+        return session
+
+@contextmanager
+def host_slot(host):
+    """Cap the number of in-flight requests per host across all threads."""
+    with _lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, PER_HOST_CONCURRENCY))
+    with slot:
+        yield
+
+def backoff_delay(attempt, response=None):
+    """Honour Retry-After when the server sends one, else full-jitter exponential backoff."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def request(method, url, via_tor=False, source=None, timeout=None, retries=MAX_RETRIES, **kwargs):
+    """Send a request through a pooled session, retrying 429/5xx and connection errors.
+
+    Sources listed in ``[tor] sources`` go out on their own TOR circuit, whose
+    latency and failures are reported to the circuit manager. Returns the
+    final response (which may still be an error status once retries are
+    exhausted) and re-raises the last connection error.
+    """
+    url = replay.rewrite_url(url)
+    # A replay stub is local, no point sending it through TOR
+    tor_source = source if source in tor_circuits.TOR_SOURCES and not replay.STUB_URL else None
+    via_tor = via_tor and not replay.STUB_URL
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    host = urlparse(url).hostname or ""
+
+    for attempt in range(retries + 1):
+        response, error, blocked = None, None, False
+        session = get_source_session(tor_source) if tor_source else get_session(via_tor)
+        with host_slot(host):
+            start = time.monotonic()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            elapsed = time.monotonic() - start
+
+        if response is not None:
+            HTTP_SECONDS.observe(elapsed, host=host)
+            HTTP_RESPONSES.inc(host=host, status=response.status_code)
+            # Streamed bodies aren't read yet, count what the server announced
+            size = response.headers.get("Content-Length") if kwargs.get("stream") else len(response.content)
+            if size is not None and str(size).isdigit():
+                HTTP_BYTES.inc(int(size), host=host)
+        else:
+            HTTP_RESPONSES.inc(host=host, status=type(error).__name__)
+
+        if tor_source:
+            circuits = tor_circuits.get_manager()
+            circuits.record(tor_source, elapsed if response is not None else None,
+                            ok=response is not None and response.status_code < 400)
+            if response is not None and response.status_code in tor_circuits.BLOCK_STATUSES:
+                circuits.report_block(tor_source, f"HTTP {response.status_code} from {host}")
+                blocked = True
+
+        # A blocked TOR source is worth retrying, the next attempt uses a fresh circuit
+        if response is not None and response.status_code not in RETRY_STATUSES and not blocked:
+            if replay.recorder is not None and source == replay.recorder.source:
+                replay.recorder.capture_response(method, response)
+            return response
+        if attempt == retries:
+            if response is not None:
+                return response
+            raise error
+
+        delay = backoff_delay(attempt, response)
+        reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+        if response is not None:
+            response.close()  # an unread streamed body would hold its pooled connection through the sleep
+        print(f"⏳ {method} {host} failed ({reason}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def conditional_get(url, validators=None, **kwargs):
+    """GET ``url`` with the ETag/Last-Modified held in ``validators``.
+
+    Returns None on 304 Not Modified; otherwise the response, with
+    ``validators`` updated in place from it on a 200 so the caller can save
+    them once the content is processed.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    if validators is not None:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = get(url, headers=headers, **kwargs)
+    if response.status_code == 304:
+        return None
+    if validators is not None and response.status_code == 200:
+        validators["etag"] = response.headers.get("ETag")
+        validators["last_modified"] = response.headers.get("Last-Modified")
+    return response
+
+# --- Async wrappers: the blocking call runs on a worker thread, the session is shared ---
+async def arequest(method, url, **kwargs):
+    return await asyncio.to_thread(request, method, url, **kwargs)
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
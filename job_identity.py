@@ -0,0 +1,49 @@
+import hashlib
+import re
+import filters
+
+# Job numbers in the posting URLs of each site, most specific first
+URL_ID_PATTERNS = [
+    re.compile(r"metacareers\.com/(?:v2/)?jobs/(\d+)"),
+    re.compile(r"careers\.microsoft\.com/.*?/job/(\d+)"),
+    re.compile(r"google\.com/.*?/jobs/results/(\d+)"),
+    re.compile(r"greenhouse\.io/.*?/jobs/(\d+)"),
+    re.compile(r"[?&]gh_jid=(\d+)"),
+    re.compile(r"jobs\.lever\.co/[^/]+/([0-9a-f-]{36})"),
+    re.compile(r"jobs\.ashbyhq\.com/[^/]+/([0-9a-f-]{36})"),
+]
+# Requisition numbers that differ between re-posts of the same job. Short codes such as
+# "(E5)" or "L4" are levels, which tell two requisitions with the same title apart.
+TITLE_NOISE = re.compile(r"[(\[]\s*(?:(?:req|jr|r)[-\s#]?)?\d[\d-]{3,}\s*[)\]]|\b(?:req|jr|r)[-\s#]?\d{3,}\b",
+                         re.IGNORECASE)
+FINGERPRINT_SIZE = 8  # bytes; collisions only matter within one dedup group
+
+def id_from_url(url):
+    for pattern in URL_ID_PATTERNS:
+        match = pattern.search(url or "")
+        if match:
+            return match.group(1)
+    return None
+
+def canonical_id(native_id=None, url=None, fallback=None):
+    """The most stable key available for a posting.
+
+    A native id from the site's API wins (``"jobs/123"`` style ids are cut to
+    their last segment), then a job number found in the URL, then
+    ``fallback`` (a label-based key, the last resort).
+    """
+    if native_id not in (None, ""):
+        return str(native_id).rstrip("/").rpartition("/")[2]
+    return id_from_url(url) or fallback
+
+def normalize_title(title):
+    return filters.normalize(TITLE_NOISE.sub(" ", title or ""))
+
+def fingerprint(group, title, location):
+    """Content fingerprint of a posting, equal for re-posts and for copies on other boards.
+
+    ``group`` scopes it (normally the company) so identical titles at
+    different companies never collide.
+    """
+    text = "\0".join((filters.normalize(group or ""), normalize_title(title), filters.normalize(location or "")))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=FINGERPRINT_SIZE).digest()
@@ -1,88 +1,224 @@
 import asyncio
-import meta as meta
-import google as ggl
-import microsoft as micr
-import deepmind as dm
+import browser_pool
+import memory_guard
+import resource_filter
+import scheduler
+import seen_store
+import sources
+import metrics
+import notifier
+import settings
+import telegram as tel
 import time
 import functools
-import requests
-import subprocess
-from stem import Signal
-from stem.control import Controller
-import os
+import http_client
+import tor_circuits
+import work_queue
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
 # Auto-flush print
 print = functools.partial(print, flush=True)
 
-# --- TOR Proxy Config ---
-proxies = {
-    'http': 'socks5h://127.0.0.1:9050',
-    'https': 'socks5h://127.0.0.1:9050',
-}
+# --- Scheduler Config ---
+SCRAPER_TIMEOUT = 900  # seconds a single scraper may run before it is abandoned
+SYNC_WORKERS = 2  # threads for the blocking HTTP calls the sources make through asyncio.to_thread
+REPORT_INTERVAL = 600  # seconds between status reports; polling itself is scheduled per source
+CONFIG_CHECK_INTERVAL = 30  # seconds between checks of config.ini for changes
 
-def rotate_tor_ip():
-    with Controller.from_port(port=9051) as c:
-        c.authenticate()
-        c.signal(Signal.NEWNYM)
+executor = ThreadPoolExecutor(max_workers=SYNC_WORKERS, thread_name_prefix="scraper")
 
 # --- TOR IP Test ---
-try:
-    print("Testing TOR connection...")
-    tor_ip = requests.get("http://httpbin.org/ip", proxies=proxies, timeout=10).text
-    print("TOR IP:", tor_ip)
-except Exception as e:
-    print(f"❌ Error testing TOR connection: {e}", file=sys.stderr)
+def check_tor():
+    """Print the TOR exit IP; only run when a source or the browser actually goes through TOR."""
+    try:
+        print("Testing TOR connection...")
+        tor_ip = http_client.get("http://httpbin.org/ip", via_tor=True, timeout=10, retries=0).text
+        print("TOR IP:", tor_ip)
+    except Exception as e:
+        print(f"❌ Error testing TOR connection: {e}", file=sys.stderr)
 
-# --- Scraping Loop ---
-async def job_search_cycle():
-    while True:
-        print("\n--- Starting new job search cycle ---")
+async def run_scraper(source, timeout=SCRAPER_TIMEOUT, queued=None):
+    """Run one source with a timeout; never raises, returns (name, status, seconds, new_jobs).
 
-        # --- Meta ---
+    ``queued`` (default: ``[workers] mode = queue``) has a worker process
+    fetch it. The status is "leased" when another process (on this or
+    another node) is scraping the same source right now.
+    """
+    name = source.name
+    queued = work_queue.MODE == "queue" if queued is None else queued
+    lease = f"source:{name}"
+    # Waits while memory is over budget (and, in low-memory mode, for the source running before it)
+    async with memory_guard.get_monitor().slot():
+        if not await asyncio.to_thread(work_queue.acquire_lease, lease, timeout + work_queue.LEASE_MARGIN):
+            print(f"⏭️ {name} is being scraped by {work_queue.lease_holder(lease)}, skipping this poll.")
+            return name, "leased", 0.0, 0
+        print(f"Running {name} scraper...")
+        start = time.monotonic()
+        status = "ok"
+        new_jobs = 0
         try:
-            print("Running Meta scraper...")
-            await meta.main()  # async
-            print("Meta scraper finished.")
+            # A blocking call still running on a worker thread can't be killed, but the loop stops waiting on it
+            if queued:
+                run = work_queue.dispatch(source, timeout)
+            else:
+                run = sources.run_source(source)
+            new_jobs = await asyncio.wait_for(run, timeout)
+            print(f"{name} scraper finished in {time.monotonic() - start:.1f}s.")
+        except asyncio.TimeoutError:
+            status = "timeout"
+            print(f"❌ {name} scraper timed out after {timeout}s", file=sys.stderr)
         except Exception as e:
-            print(f"❌ Error running Meta scraper: {e}", file=sys.stderr)
+            status = "error"
+            print(f"❌ Error running {name} scraper: {e}", file=sys.stderr)
+        finally:
+            await asyncio.to_thread(work_queue.release_lease, lease)
+        return name, status, time.monotonic() - start, new_jobs
 
-        # Rotate TOR IP after Meta
-        try:
-            print("Rotating TOR IP...")
-            rotate_tor_ip()
-            await asyncio.sleep(5)  # fixed: must be await not time.sleep
-        except Exception as e:
-            print(f"❌ Error rotating TOR IP: {e}", file=sys.stderr)
+# --- Scraping Loop ---
+async def poll_source(name, active, poll_scheduler):
+    """Poll one source forever, each time after the delay its schedule picks.
 
-        # --- Microsoft ---
-        try:
-            print("Running Microsoft scraper...")
-            await micr.main()  # async
-            print("Microsoft scraper finished.")
-        except Exception as e:
-            print(f"❌ Error running Microsoft scraper: {e}", file=sys.stderr)
+    The source is looked up in ``active`` before every poll, so a rebuilt
+    one takes over from the next poll on.
+    """
+    while True:
+        await asyncio.sleep(poll_scheduler.delay(name))
+        name, status, elapsed, new_jobs = await run_scraper(active[name])
+        if status == "leased":
+            delay = poll_scheduler.postpone(name)  # someone else's poll, not a sample of ours
+        else:
+            delay = poll_scheduler.record(name, new_jobs, elapsed, ok=status == "ok")
+        print(f"--- {name}: {status}, {new_jobs} new in {elapsed:.1f}s; next poll in {delay / 60:.1f} minutes ---")
 
-        # --- Google ---
-        try:
-            print("Running Google scraper...")
-            ggl.main()  # normal function, no await
-            print("Google scraper finished.")
-        except Exception as e:
-            print(f"❌ Error running Google scraper: {e}", file=sys.stderr)
+async def search_once(enabled=None):
+    """Run every enabled source once, concurrently; returns the run_scraper results.
 
-        # --- DeepMind ---
+    The pass runs in this process whatever ``[workers] mode`` says: it starts
+    no workers, and queued tasks would wait for a coordinator's.
+    """
+    asyncio.get_running_loop().set_default_executor(executor)
+    enabled = sources.enabled_sources() if enabled is None else enabled
+    monitor = memory_guard.get_monitor()
+    monitor.take_peak()
+    monitor_task = asyncio.create_task(monitor.run())
+    start = time.monotonic()
+    try:
+        results = await asyncio.gather(*(run_scraper(source, queued=False) for source in enabled))
+    finally:
+        monitor_task.cancel()
+    print("--- Summary ---")
+    for name, status, elapsed, new_jobs in results:
+        print(f"  {name:<10} {status:<8} {elapsed:7.1f}s {new_jobs:5d} new")
+    print(f"  {'Total':<10} {'':<8} {time.monotonic() - start:7.1f}s, peak memory {monitor.take_peak():.0f} MB")
+    return results
+
+def sync_sources(active, pollers, poll_scheduler):
+    """Start, stop and rebuild sources until they match ``[sources] enabled`` and their sections.
+
+    ``active`` maps names to built sources and ``pollers`` to their tasks.
+    Only sources whose options changed are rebuilt; they keep their poll
+    schedule, and Chromium and the stores stay as they are.
+    """
+    enabled = sources.enabled_source_names()
+    for name in [name for name in active if name not in enabled]:
+        pollers.pop(name).cancel()
+        del active[name]
+        poll_scheduler.remove(name)
+        print(f"➖ {name} disabled.")
+    for name in enabled:
+        current = active.get(name)
+        if current is not None and current.config_key == sources.config_key(name):
+            continue
         try:
-            print("Running DeepMind scraper...")
-            dm.main()  # normal function, no await
-            print("DeepMind scraper finished.")
+            active[name] = sources.build_source(name)
         except Exception as e:
-            print(f"❌ Error running DeepMind scraper: {e}", file=sys.stderr)
+            print(f"❌ Skipping source {name}: {e}", file=sys.stderr)
+            continue
+        options = settings.config[f"source:{name}"]
+        if current is None:
+            # Each source gets its own poll interval, adapted to how often it posts
+            poll_scheduler.add(scheduler.SourceSchedule.from_options(name, options))
+            pollers[name] = asyncio.create_task(poll_source(name, active, poll_scheduler))
+            print(f"➕ {name} enabled.")
+        else:
+            poll_scheduler.update_bounds(name, options)
+            print(f"🔄 {name} rebuilt with its new options.")
+
+async def watch_config(active, pollers, poll_scheduler):
+    """Apply changes to config.ini while running; a file with errors is reported and ignored."""
+    while True:
+        await asyncio.sleep(CONFIG_CHECK_INTERVAL)
+        if settings.reload(check=sources.check_config):
+            print(f"🔄 Reloaded {settings.CONFIG_FILE}.")
+            sync_sources(active, pollers, poll_scheduler)
+
+async def report_forever(poll_scheduler):
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        report(poll_scheduler)
+
+def report(poll_scheduler):
+    print("\n--- Status ---")
+    poll_scheduler.report()
+    monitor = memory_guard.get_monitor()
+    budget = f"budget {monitor.budget_mb} MB" if monitor.budget_mb else "no budget"
+    print(f"  🧠 Peak memory since the last report: {monitor.take_peak():.0f} MB ({budget}"
+          f"{', low-memory mode' if memory_guard.LOW_MEMORY else ''})")
+    resource_filter.report()
+    tor_circuits.get_manager().report()
+
+    store = seen_store.get_store()
+    store.report()
+    store.expire_old()
+    print(f"  📨 Notifications waiting in the outbox: {notifier.pending_count()}")
+
+async def job_search_cycle():
+    metrics.start_server()
+    if work_queue.MODE == "queue":
+        # One coordinator per queue: it alone stores and notifies, from this node's seen store and outbox
+        await work_queue.become_coordinator()
+    # Scrapers only queue notifications; this task delivers them at Telegram's pace
+    notifier_task = asyncio.create_task(notifier.run_worker(tel.deliver))
+    # Samples RSS against the budget, frees memory and holds new scraper runs when it is exceeded
+    monitor_task = asyncio.create_task(memory_guard.get_monitor().run())
+    asyncio.get_running_loop().set_default_executor(executor)
+    tor_check = None
+    if tor_circuits.TOR_SOURCES or browser_pool.PROXY:
+        # In the background, so a slow or missing TOR doesn't hold up the first polls
+        tor_check = asyncio.create_task(asyncio.to_thread(check_tor))
+    # In queue mode the fetching happens in worker processes, the pollers only dispatch and store
+    workers = work_queue.start_workers() if work_queue.MODE == "queue" else []
+    # Sources are listed in [sources] enabled; each one's settings live in its [source:<name>] section
+    active, pollers = {}, {}
+    poll_scheduler = scheduler.Scheduler([])
+    sync_sources(active, pollers, poll_scheduler)
+    watcher_task = asyncio.create_task(watch_config(active, pollers, poll_scheduler))
+
+    main_tasks = [asyncio.create_task(report_forever(poll_scheduler))]
+    if work_queue.MODE == "queue":
+        main_tasks.append(asyncio.create_task(work_queue.hold_coordinator()))
 
-        print(f"--- Cycle finished. Waiting for 600 seconds (10 minutes)... ---")
-        await asyncio.sleep(600)
+    try:
+        # Only ends if the coordinator lease is lost: a standby has taken over, so this one stops
+        await asyncio.wait(main_tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in list(pollers.values()) + main_tasks + [watcher_task, notifier_task, monitor_task]:
+            task.cancel()
+        if tor_check is not None:
+            tor_check.cancel()
+        for process in workers:
+            process.terminate()
 
 # --- Run everything ---
 if __name__ == "__main__":
-    print("Starting async job search system...")
-    asyncio.run(job_search_cycle())
+    if "--worker" in sys.argv[1:]:
+        # Fetches tasks queued by a coordinator (see [workers]), e.g. on another Pi
+        work_queue.run_worker()
+    elif "--once" in sys.argv[1:]:
+        # One pass over every source, e.g. against a replay stub
+        browser_pool.run(search_once)
+        tel.drain()
+    else:
+        print("Starting async job search system...")
+        browser_pool.run(job_search_cycle)  # closes the shared Chromium on exit
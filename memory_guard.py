@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import gc
+import inspect
+import os
+import sys
+from contextlib import asynccontextmanager
+import metrics
+import settings
+
+print = functools.partial(print, flush=True)
+
+# For 1-2 GB boards: one tab, one page and one source at a time, smaller caches,
+# seen jobs written in small batches and Chromium recycled sooner (see cap())
+LOW_MEMORY = settings.getboolean('memory', 'low_memory', False)
+RSS_BUDGET_MB = settings.getint('memory', 'rss_budget_mb', 900)  # whole process tree, Chromium included; 0 disables
+CHECK_INTERVAL = settings.getfloat('memory', 'check_interval', 5)  # seconds between RSS samples
+MAX_HOLD = 300  # seconds a source waits for memory before running anyway
+
+PROCESS_RSS = metrics.gauge("process_rss_megabytes", "Resident memory of the scraper and its Chromium processes")
+PRESSURE_EVENTS = metrics.counter("memory_pressure_total", "Times the process tree crossed the RSS budget")
+
+def cap(value, low_memory_value):
+    """``value``, or at most ``low_memory_value`` in low-memory mode."""
+    return min(value, low_memory_value) if LOW_MEMORY else value
+
+# --- Process Memory ---
+def process_tree_rss_mb(root_pid):
+    """Sum the resident memory of a process and all its descendants (Linux /proc only)."""
+    children = {}
+    rss_kb = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status') as f:
+                ppid, rss = None, 0
+                for line in f:
+                    if line.startswith('PPid:'):
+                        ppid = int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss = int(line.split()[1])
+        except (OSError, ValueError):
+            continue  # process exited while we were scanning
+        pid = int(entry)
+        rss_kb[pid] = rss
+        children.setdefault(ppid, []).append(pid)
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / 1024
+
+# --- Budget Monitor ---
+class MemoryMonitor:
+    """Samples the RSS of this process and its children against ``rss_budget_mb``.
+
+    Over budget, it collects garbage, asks every registered ``on_pressure``
+    callback to free what it can (the browser pool closes an idle Chromium)
+    and holds new source runs in ``slot()`` until usage is back under the
+    budget. In low-memory mode ``slot()`` also lets only one source run at a
+    time. The peak since the last ``take_peak()`` is kept for reports.
+    """
+
+    def __init__(self, budget_mb=RSS_BUDGET_MB, interval=CHECK_INTERVAL):
+        self.budget_mb = budget_mb
+        self.interval = interval
+        self.current_mb = 0.0
+        self.peak_mb = 0.0
+        self._callbacks = []
+        self._headroom = asyncio.Event()
+        self._headroom.set()
+        self._runs = asyncio.Semaphore(1) if LOW_MEMORY else None
+
+    def on_pressure(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def sample(self):
+        self.current_mb = process_tree_rss_mb(os.getpid())
+        self.peak_mb = max(self.peak_mb, self.current_mb)
+        PROCESS_RSS.set(round(self.current_mb, 1))
+        return self.current_mb
+
+    def take_peak(self):
+        """Peak RSS since the previous call, in MB."""
+        peak = max(self.peak_mb, self.sample())
+        self.peak_mb = self.current_mb
+        return peak
+
+    async def check(self):
+        if not self.budget_mb or self.sample() <= self.budget_mb:
+            self._headroom.set()
+            return
+        if self._headroom.is_set():
+            PRESSURE_EVENTS.inc()
+            print(f"⚠️ Using {self.current_mb:.0f} MB (budget {self.budget_mb} MB), "
+                  f"holding new scraper runs until memory is freed.", file=sys.stderr)
+        self._headroom.clear()
+        gc.collect()
+        for callback in list(self._callbacks):
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"❌ Memory pressure callback failed: {e}", file=sys.stderr)
+        if self.sample() <= self.budget_mb:
+            self._headroom.set()
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    async def _wait_for_headroom(self):
+        try:
+            await asyncio.wait_for(self._headroom.wait(), MAX_HOLD)
+        except asyncio.TimeoutError:
+            # A budget below what one scraper needs must not stop scraping altogether
+            print(f"⚠️ Still over the memory budget after {MAX_HOLD}s, running anyway.", file=sys.stderr)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait until a source may start; held for the length of its run."""
+        if self._runs is None:
+            await self._wait_for_headroom()
+            yield
+            return
+        async with self._runs:
+            await self._wait_for_headroom()
+            yield
+
+_monitor = None
+
+def get_monitor():
+    global _monitor
+    if _monitor is None:
+        _monitor = MemoryMonitor()
+    return _monitor
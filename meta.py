@@ -1,12 +1,13 @@
-import asyncio
-import os
 import re
-from datetime import datetime
-from bs4 import BeautifulSoup
-from pyppeteer import launch
 import telegram as tel
+import dom_extract
+import high_water
+import job_identity
+import paginator
+import sources
 import sys
 import functools
+from contextlib import aclosing
 
 print = functools.partial(print, flush=True)
 
@@ -15,115 +16,174 @@ FILTERED_URL = (
     "roles[0]=Full%20time%20employment&sort_by_new=true&q=Machine%20learning"
     "&teams[0]=Software%20Engineering&teams[1]=Data%20%26%20Analytics"
 )
-SEEN_FILE = "seen_jobs_meta.txt"
-
-# --- Load/Save Seen Jobs ---
-def load_seen_jobs():
-    if not os.path.exists(SEEN_FILE):
-        return set()
-    with open(SEEN_FILE, "r", encoding="utf-8") as f:
-        return set("::".join(line.strip().split("::")[:2]) for line in f if line.strip() and "::" in line)
-
-def save_seen_job(url, title, location, date):
-    with open(SEEN_FILE, "a", encoding="utf-8") as f:
-        f.write(f"{url}::{title} — {location}::{date}\n")
-
-# --- Main Scraper ---
-async def main():
-    print("Meta scraper (pyppeteer version) started.")
-    first_run = not os.path.exists(SEEN_FILE) or os.stat(SEEN_FILE).st_size == 0
-    seen_jobs = load_seen_jobs()
-    new_jobs_found_overall = 0
-
-    browser = await launch({
-        'headless': True,
-        'executablePath': '/usr/bin/chromium-browser',
-        'args': ['--no-sandbox', '--disable-gpu']
-    })
-    page = await browser.newPage()
-
-    page_num = 1
-
-    try:
-        while True:
-            paged_url = f"{FILTERED_URL}&page={page_num}"
-            print(f"🔗 Loading Meta page {page_num}: {paged_url}")
-
-            new_jobs_found_page = 0
-
-            try:
-                await page.goto(paged_url, timeout=30000)
-                await asyncio.sleep(3)  # You asked to keep logic same for now
-                content = await page.content()
-                soup = BeautifulSoup(content, "html.parser")
-
-                job_links = soup.find_all("a", href=lambda x: x and x.startswith("/jobs/"))
-
-                if not job_links:
+# Job cards are links into /jobs/<id>; wait for the first one instead of a fixed sleep
+READY_SELECTOR = 'a[href^="/jobs/"]'
+SOURCE = "meta"
+MAX_FAILED_PAGES = 3  # consecutive pages that failed to load before giving up on the run
+JOB_ID_PATTERN = re.compile(r"^/jobs/(\d+)")
+
+# --- Page Parsing ---
+# Evaluated inside the page; returns the same raw fields as parse_raw_cards
+EXTRACT_CARDS_JS = """
+() => {
+    const cards = [];
+    const seen = new Set();
+    for (const link of document.querySelectorAll('a[href^="/jobs/"]')) {
+        const href = link.getAttribute('href');
+        if (!href || seen.has(href)) continue;
+        seen.add(href);
+        const titleEl = link.querySelector('div._6g3g');
+        const locationEl = link.querySelector('span');
+        const texts = [];
+        const walker = document.createTreeWalker(link, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            const text = walker.currentNode.nodeValue.trim();
+            if (text) texts.push(text);
+        }
+        cards.push({
+            href: href,
+            title: titleEl ? titleEl.textContent.trim() : null,
+            location: locationEl ? locationEl.textContent.trim() : null,
+            text: texts.join(' | '),
+        });
+    }
+    return cards;
+}
+"""
+
+def parse_raw_cards(content):
+    """Offline counterpart of EXTRACT_CARDS_JS for serialized or saved HTML."""
+    cards = []
+    processed_hrefs_on_page = set()
+
+    with dom_extract.parsed(content) as soup:
+        for job_link_tag in soup.find_all("a", href=lambda x: x and x.startswith("/jobs/")):
+            href = job_link_tag.get("href")
+            if not href or href in processed_hrefs_on_page:
+                continue
+            processed_hrefs_on_page.add(href)
+
+            title_div = job_link_tag.find("div", class_="_6g3g")
+            location_tag = job_link_tag.find("span")
+            cards.append({
+                "href": href,
+                "title": title_div.get_text(strip=True) if title_div else None,
+                "location": location_tag.get_text(strip=True) if location_tag else None,
+                "text": job_link_tag.get_text(" | ", strip=True),
+            })
+
+    return cards
+
+def build_cards(raw_cards):
+    """Turn raw card fields into ``{id, url, title, location}`` dicts."""
+    cards = []
+    for raw in raw_cards:
+        full_url = f"https://www.metacareers.com{raw['href']}"
+        title = "Unknown Title"
+        location = "Unknown Location"
+        try:
+            title = raw.get("title") or "Unknown Title"
+            location = raw.get("location") or "Unknown Location"
+
+            if title == "Unknown Title" or location == "Unknown Location":
+                all_text = raw.get("text") or ""
+                parts = all_text.split("|", 1)
+                title = parts[0].strip() if parts else all_text
+                location = parts[1].strip() if len(parts) > 1 else "Unknown Location"
+
+        except Exception as e:
+            print(f"Error parsing job details for {full_url}: {e}", file=sys.stderr)
+            tel.send_notification(f"Error parsing Meta job details: {full_url}")
+
+        match = JOB_ID_PATTERN.search(raw["href"])
+        cards.append({"id": match.group(1) if match else None, "url": full_url, "title": title, "location": location})
+
+    return cards
+
+def parse_job_cards(content):
+    return build_cards(parse_raw_cards(content))
+
+async def extract_job_cards(page):
+    return build_cards(await dom_extract.extract(page, EXTRACT_CARDS_JS, parse_raw_cards))
+
+# --- Source ---
+@sources.register("meta")
+class MetaSource:
+    """Meta careers search results, scraped page by page in the shared browser."""
+
+    # The listing isn't sorted by date, so the first run only records what is already open
+    quiet_first_run = True
+
+    def __init__(self, name, options):
+        self.name = name
+        self.company = options.get("company", "Meta")
+        self.url = options.get("url", FILTERED_URL)
+        self.options = options
+        self._mark = None
+        self._reached_end = False
+
+    def record(self, card):
+        full_url, title, location = card["url"], card["title"], card["location"]
+        return sources.JobRecord(
+            source=self.name,
+            # The job number in the URL is stable; the label-based key is a last resort
+            job_id=job_identity.canonical_id(card["id"], full_url, fallback=f"{full_url}::{title} — {location}"),
+            company=self.company,
+            title=title,
+            location=location,
+            url=full_url,
+        )
+
+    async def fetch(self):
+        print("Meta scraper (pyppeteer version) started.")
+        self.complete = False
+        self._reached_end = False
+        # sort_by_new=true: once a page only lists known postings, the pages after it are known too
+        self._mark = mark = high_water.HighWaterMark.from_options(self.name, self.options)
+        if mark.full_sweep:
+            print("Meta: full sweep of every result page.")
+        failed_pages = consecutive_failures = 0
+        pages = paginator.prefetch_pages(
+            "Meta", lambda page_num: f"{self.url}&page={page_num}", READY_SELECTOR, extract_job_cards
+        )
+
+        async with aclosing(pages):
+            async for page_num, cards in pages:
+                if cards is None:
+                    failed_pages += 1
+                    consecutive_failures += 1
+                    if consecutive_failures >= MAX_FAILED_PAGES:
+                        print(f"❌ {consecutive_failures} Meta pages in a row failed to load. Giving up on this run.",
+                              file=sys.stderr)
+                        break
+                    continue  # A single failed page doesn't end the run
+                consecutive_failures = 0
+
+                if not cards:
                     if page_num == 1:
                         print(f"⚠️ No job links found on first page. Structure might have changed.")
                     else:
                         print(f"✅ No more job listings found. Exiting pagination.")
+                        # Every page up to the end loaded, so a posting missing from them has closed
+                        self._reached_end = failed_pages == 0
+                        self.complete = self._reached_end
                     break  # ✅ Stop if no job links found
 
-                print(f"Found {len(job_links)} potential job links on page {page_num}.")
+                print(f"Found {len(cards)} job links on page {page_num}.")
 
-                processed_hrefs_on_page = set()
+                # Checked before the records are yielded, since storing them makes them known
+                records = [self.record(card) for card in cards]
+                more = mark.check_page(records)
+                for record in records:
+                    yield record
+                if not more:
+                    break
 
-                for job_link_tag in job_links:
-                    href = job_link_tag.get("href")
-                    if not href or href in processed_hrefs_on_page:
-                        continue
-                    processed_hrefs_on_page.add(href)
-                    full_url = f"https://www.metacareers.com{href}"
-
-                    title = "Unknown Title"
-                    location = "Unknown Location"
-                    try:
-                        title_div = job_link_tag.find("div", class_="_6g3g")
-                        title = title_div.get_text(strip=True) if title_div else "Unknown Title"
-
-                        location_tag = job_link_tag.find("span")
-                        location = location_tag.get_text(strip=True) if location_tag else "Unknown Location"
-
-                        if title == "Unknown Title" or location == "Unknown Location":
-                            all_text = job_link_tag.get_text(" | ", strip=True)
-                            parts = all_text.split("|", 1)
-                            title = parts[0].strip() if parts else all_text
-                            location = parts[1].strip() if len(parts) > 1 else "Unknown Location"
-
-                    except Exception as e:
-                        print(f"Error parsing job details for {full_url}: {e}", file=sys.stderr)
-                        tel.send_notification(f"Error parsing Meta job details: {full_url}")
-
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    job_key = f"{full_url}::{title} — {location}"
-
-                    if job_key not in seen_jobs:
-                        new_jobs_found_page += 1
-                        seen_jobs.add(job_key)
-                        save_seen_job(full_url, title, location, today)
-
-                        if not first_run:
-                            print(f"✨ New Meta Job Found: {title} — {location}")
-                            tel.send_notification(f"Meta: 🔹 {title} — {location} \n🔗 {full_url}")
-                        else:
-                            print(f"Found (first run): {title} — {location}")
-
-                if new_jobs_found_page == 0:
-                    print(f"No new jobs found on Meta page {page_num}.")
-
-            except Exception as e:
-                print(f"❌ Error scraping Meta page {page_num}: {e}", file=sys.stderr)
-                # ✅ Even if error happens, go to next page
-
-            page_num += 1
-            await asyncio.sleep(3)
-
-    finally:
-        await browser.close()
-        print(f"Meta scraper finished. Found {new_jobs_found_overall} new jobs overall.")
+    async def commit(self):
+        if self._mark is not None:
+            self._mark.save(reached_end=self._reached_end)
+            self._mark = None
 
 # --- Run if standalone ---
 if __name__ == "__main__":
-    asyncio.run(main())
+    sources.run_once(SOURCE)
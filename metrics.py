@@ -0,0 +1,195 @@
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import settings
+
+print = functools.partial(print, flush=True)
+
+METRICS_PORT = settings.getint('metrics', 'port', 9108)  # 0 disables the /metrics endpoint
+METRICS_HOST = settings.get('metrics', 'host', '127.0.0.1')
+TRACE_FILE = settings.get('metrics', 'trace_path', 'metrics_trace.jsonl')  # empty disables tracing
+TRACE_MAX_MB = settings.getfloat('metrics', 'trace_max_mb', 20)  # rotated to <trace_path>.1 beyond this
+PREFIX = "jobscraper_"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500)
+
+_lock = threading.Lock()
+_metrics = {}
+_callbacks = []
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key):
+    if not key:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in key)
+    return "{" + ",".join(escaped) + "}"
+
+# --- Metric types ---
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self.values = {}
+
+    def inc(self, value=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in self.values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[_label_key(labels)] = value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self.values = {}  # label key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):  # larger values only show up in +Inf (the count)
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        samples = []
+        for key, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), state[-1]))
+            samples.append((f"{self.name}_sum", key, state[-2]))
+            samples.append((f"{self.name}_count", key, state[-1]))
+        return samples
+
+def _register(cls, name, help_text, *args):
+    name = PREFIX + name
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help_text, *args)
+    return metric
+
+def counter(name, help_text):
+    return _register(Counter, name, help_text)
+
+def gauge(name, help_text):
+    return _register(Gauge, name, help_text)
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    return _register(Histogram, name, help_text, buckets)
+
+def on_collect(callback):
+    """Call ``callback()`` before every scrape/render, to refresh gauges that are cheap to read on demand."""
+    _callbacks.append(callback)
+    return callback
+
+# --- Exposition ---
+def render():
+    """All metrics in the Prometheus text format."""
+    for callback in list(_callbacks):
+        try:
+            callback()
+        except Exception as e:
+            print(f"⚠️ Metrics collector {getattr(callback, '__name__', callback)} failed: {e}", file=sys.stderr)
+    lines = []
+    with _lock:
+        for name, metric in sorted(_metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, key, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scraped every few seconds, not worth a log line
+
+_server = None
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a daemon thread; a no-op when disabled or already running."""
+    global _server
+    if not port or _server is not None:
+        return None
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"❌ Could not start the metrics endpoint on {host}:{port}: {e}", file=sys.stderr)
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return _server
+
+# --- Tracing ---
+_trace_lock = threading.Lock()
+
+def trace(event, **fields):
+    """Append one event to the JSON-lines trace file."""
+    if not TRACE_FILE:
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+    with _trace_lock:
+        try:
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_MAX_MB * 1024 * 1024:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write trace event: {e}", file=sys.stderr)
+
+@contextmanager
+def span(event, histogram_metric=None, **labels):
+    """Time a block into ``histogram_metric`` and trace it; extra fields can be added to the yielded dict.
+
+    Works around ``await`` too: it only reads the clock on entry and exit.
+    """
+    fields = {}
+    start = time.monotonic()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        elapsed = time.monotonic() - start
+        if histogram_metric is not None:
+            histogram_metric.observe(elapsed, **labels)
+        trace(event, seconds=round(elapsed, 4), status=status, **labels, **fields)
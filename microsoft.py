@@ -1,159 +1,298 @@
-import asyncio
-import os
 import re
+import asyncio
 import functools
 import sys
+from contextlib import aclosing
 from datetime import datetime
-from bs4 import BeautifulSoup
-from pyppeteer import launch
-import telegram as tel
+from urllib.parse import quote, urlencode
+import high_water
+import http_client
+import job_identity
+import settings
+import sources
 
 print = functools.partial(print, flush=True)
 
+# Shared by the careers site (browser fallback) and the JSON search API
+SEARCH_FILTERS = [
+    ("q", "ai"),
+    ("lc", "Canada"), ("lc", "United States"),
+    ("p", "Research, Applied, & Data Sciences"), ("p", "Software Engineering"),
+    ("d", "Data Science"), ("d", "Software Engineering"),
+    ("exp", "Experienced professionals"),
+    ("et", "Full-Time"),
+    ("l", "en_us"),
+]
+PAGE_SIZE = 20
 BASE_URL = (
     "https://jobs.careers.microsoft.com/global/en/search?"
-    "q=ai&lc=Canada&lc=United%20States"
-    "&p=Research%2C%20Applied%2C%20%26%20Data%20Sciences"
-    "&p=Software%20Engineering"
-    "&d=Data%20Science&d=Software%20Engineering"
-    "&exp=Experienced%20professionals"
-    "&et=Full-Time&l=en_us"
-    "&pg={page}&pgSz=20&o=Recent"
+    + urlencode(SEARCH_FILTERS, quote_via=quote)
+    + f"&pg={{page}}&pgSz={PAGE_SIZE}&o=Recent"
 )
-SEEN_FILE = "seen_jobs_microsoft.txt"
-
-# --- Seen Jobs Utilities ---
-def ensure_seen_file():
-    if not os.path.exists(SEEN_FILE):
-        with open(SEEN_FILE, "w", encoding="utf-8"):
-            pass
-
-def load_seen_jobs():
-    ensure_seen_file()
-    try:
-        with open(SEEN_FILE, "r", encoding="utf-8") as f:
-            return set("::".join(line.strip().split("::")[:2]) for line in f if line.strip() and "::" in line)
-    except Exception as e:
-        print(f"❌ Error loading seen jobs: {e}", file=sys.stderr)
-        return set()
-
-def save_seen_job(url, title, location, date):
-    try:
-        with open(SEEN_FILE, "a", encoding="utf-8") as f:
-            f.write(f"{url}::{title} — {location}::{date}\n")
-    except Exception as e:
-        print(f"❌ Error saving seen job: {e}", file=sys.stderr)
-
-# --- Main Scraper ---
-async def main():
-    print("Microsoft scraper (pyppeteer version) started.")
-
-    seen_jobs = load_seen_jobs()
-    first_run = len(seen_jobs) == 0
-    new_jobs_found_overall = 0
-
-    browser = await launch({
-        'headless': True,
-        'executablePath': '/usr/bin/chromium-browser',
-        'args': ['--no-sandbox', '--disable-gpu']
-    })
-
-    page = await browser.newPage()
+API_URL = "https://gcsservices.careers.microsoft.com/search/api/v1/search"
+JOB_URL = "https://jobs.careers.microsoft.com/global/en/job/{job_id}"
+MAX_API_PAGES = 50
+# Properties of an API result kept in the history archive
+API_DETAIL_FIELDS = ("locations", "workSiteFlexibility", "profession", "discipline", "roleType", "employmentType",
+                     "educationLevel")
+# Render the careers site in Chromium only if the API fails and this is enabled
+BROWSER_FALLBACK = settings.getboolean('microsoft', 'browser_fallback', False)
+READY_SELECTOR = "div.ms-DocumentCard"
+SOURCE = "microsoft"
+JOB_ID_PATTERN = re.compile(r"/global/en/job/(\d+)")
+
+# --- JSON Search API ---
+def parse_api_job(job):
+    """Turn one search API result into the same card dict the page parser returns."""
+    job_id = str(job.get("jobId", "")).strip()
+    properties = job.get("properties") or {}
+    locations = properties.get("locations") or []
+    location = properties.get("primaryLocation") or (locations[0] if locations else "Unknown Location")
+
+    posted_raw = job.get("postingDate", "")
+    posted = "Unknown Date"
+    if posted_raw:
+        try:
+            posted = datetime.fromisoformat(posted_raw.replace("Z", "+00:00")).strftime("%Y-%m-%d")
+        except ValueError:
+            print(f"⚠️ Could not parse posting date: {posted_raw}")
+
+    details = {key: value if isinstance(value, str) else "; ".join(map(str, value))
+               for key, value in properties.items() if key in API_DETAIL_FIELDS and value}
+    return {
+        "id": job_id,
+        "url": JOB_URL.format(job_id=job_id),
+        "title": (job.get("title") or "Unknown Title").strip(),
+        "location": location,
+        "date": posted,
+        "details": details,
+    }
+
+def fetch_api_page(page_num, source=SOURCE):
+    """Fetch one page of search results; returns ``(cards, total_jobs)``."""
+    params = SEARCH_FILTERS + [("pg", page_num), ("pgSz", PAGE_SIZE), ("o", "Recent"), ("flt", "true")]
+    response = http_client.get(API_URL, params=params, source=source)
+    response.raise_for_status()
+    result = response.json().get("operationResult", {}).get("result", {})
+    jobs = [parse_api_job(job) for job in result.get("jobs", []) if job.get("jobId")]
+    return jobs, result.get("totalJobs", 0)
+
+def has_cards(page_num, cards):
+    """Returns False (and says why) once pagination should stop."""
+    if not cards:
+        if page_num == 1:
+            print("❌ Failed to find job listings on first page. Check layout or query.")
+        else:
+            print("✅ No more job listings found. Stopping pagination.\n")
+        return False  # ✅ No jobs → Stop pagination
+    print(f"📄 Found {len(cards)} jobs on page {page_num}.")
+    return True
+
+async def scrape_api(source=SOURCE):
+    """Yield the cards of each API page, newest first."""
     page_num = 1
-
-    try:
-        while True:
-            url = BASE_URL.format(page=page_num)
-            print(f"🔗 Loading Microsoft page {page_num}: {url}")
-
+    while page_num <= MAX_API_PAGES:
+        print(f"🔗 Fetching Microsoft API page {page_num}")
+        cards, total_jobs = await asyncio.to_thread(fetch_api_page, page_num, source)
+        if not has_cards(page_num, cards):
+            break
+        yield cards
+        if page_num * PAGE_SIZE >= total_jobs:
+            break
+        page_num += 1
+
+async def scrape_browser():
+    """Yield the cards of each careers site page, newest first."""
+    import paginator  # only the browser fallback loads pyppeteer
+    pages = paginator.prefetch_pages(
+        "Microsoft", lambda page_num: BASE_URL.format(page=page_num), READY_SELECTOR, extract_job_cards
+    )
+    async with aclosing(pages):
+        async for page_num, cards in pages:
+            if cards is None or not has_cards(page_num, cards):
+                break  # ✅ Break loop if page fails badly or has no jobs
+            yield cards
+
+# --- Page Parsing ---
+# Evaluated inside the page; returns the same raw fields as parse_raw_cards
+EXTRACT_CARDS_JS = """
+() => {
+    const text = el => (el ? el.textContent.trim() : null);
+    const nextSpan = el => {
+        // Same as BeautifulSoup's find_next("span"): first <span> after el in document order
+        if (!el) return null;
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT);
+        walker.currentNode = el;
+        while (walker.nextNode()) {
+            if (walker.currentNode.tagName === 'SPAN') return walker.currentNode;
+        }
+        return null;
+    };
+    return Array.from(document.querySelectorAll('div.ms-DocumentCard'), card => {
+        const link = Array.from(card.querySelectorAll('a[href]'))
+            .find(a => /\\/global\\/en\\/job\\/\\d+\\//.test(a.getAttribute('href')));
+        const item = card.parentElement && card.parentElement.closest('div[aria-label*="Job item"]');
+        return {
+            title: text(card.querySelector('h2')),
+            location: text(nextSpan(card.querySelector('i[data-icon-name="POI"]'))),
+            date: text(nextSpan(card.querySelector('i[data-icon-name="Clock"]'))),
+            item_label: item ? item.getAttribute('aria-label') : null,
+            href: link ? link.getAttribute('href') : null,
+            link_text: text(link),
+        };
+    });
+}
+"""
+
+def parse_raw_cards(content):
+    """Offline counterpart of EXTRACT_CARDS_JS for serialized or saved HTML."""
+    import dom_extract  # bs4 is only needed for the browser fallback and saved pages
+    cards = []
+
+    with dom_extract.parsed(content) as soup:
+        for card in soup.find_all("div", class_="ms-DocumentCard"):
             try:
-                await page.goto(url, timeout=30000)
-                await page.waitForSelector('div.ms-DocumentCard', timeout=15000)  # ✅ Wait properly for job cards
-
-                content = await page.content()
-                soup = BeautifulSoup(content, "html.parser")
-
-                job_cards = soup.find_all("div", class_="ms-DocumentCard")
-
-                if not job_cards:
-                    if page_num == 1:
-                        print("❌ Failed to find job listings on first page. Check layout or query.")
-                    else:
-                        print("✅ No more job listings found. Stopping pagination.\n")
-                    break  # ✅ No jobs → Stop pagination
-
-                print(f"📄 Found {len(job_cards)} jobs on page {page_num}.")
-
-                new_jobs_found_page = 0
-
-                for card in job_cards:
-                    try:
-                        title_tag = card.find("h2")
-                        title = title_tag.get_text(strip=True) if title_tag else "Unknown Title"
-
-                        location_tag = card.find("i", {"data-icon-name": "POI"})
-                        location_text = location_tag.find_next("span").get_text(strip=True) if location_tag else "Unknown Location"
-
-                        date_tag = card.find("i", {"data-icon-name": "Clock"})
-                        date_text = date_tag.find_next("span").get_text(strip=True) if date_tag else "Unknown Date"
-
-                        parent_div = card.find_parent("div", attrs={"aria-label": re.compile(r"Job item \d+")})
-                        job_id = None
-                        if parent_div:
-                            match = re.search(r"Job item (\d+)", parent_div.get("aria-label", ""))
-                            if match:
-                                job_id = match.group(1)
-
-                        link_tag = card.find("a", href=re.compile(r"/global/en/job/\d+/"))
-                        job_url = None
-                        if link_tag:
-                            job_url = f"https://jobs.careers.microsoft.com{link_tag['href']}"
-                            if title == "Unknown Title":
-                                title = link_tag.get_text(strip=True) or "Unknown Title"
-
-                        if not job_url and job_id:
-                            slug = title.lower().replace(" ", "-").replace("–", "-").replace("&", "").replace(",", "").replace("’", "").replace(":", "")
-                            slug = re.sub(r"[^a-z0-9\-]", "", slug)
-                            slug = slug[:80]
-                            job_url = f"https://jobs.careers.microsoft.com/global/en/job/{job_id}/{slug}"
-
-                        if not job_url:
-                            print(f"⚠️ Skipping card (no URL): {title} — {location_text}")
-                            continue
-
-                        job_key = f"{job_url}::{title} — {location_text}"
-
-                        if job_key not in seen_jobs:
-                            new_jobs_found_page += 1
-                            new_jobs_found_overall += 1
-                            seen_jobs.add(job_key)
-                            save_seen_job(job_url, title, location_text, datetime.now().strftime("%Y-%m-%d"))
-
-                            if not first_run:
-                                print(f"✨ New Job Found: {title} — {location_text}")
-                                tel.send_notification(f"Microsoft: 🔹 {title} — {location_text} \n🕒 {date_text} \n🔗 {job_url}")
-                            else:
-                                print(f"Found (first run): {title} — {location_text}")
-
-                    except Exception as e:
-                        print(f"❌ Error processing job card: {e}", file=sys.stderr)
-                        continue
-
-                if new_jobs_found_page == 0:
-                    print(f"No new jobs found on Microsoft page {page_num}.")
-
-                page_num += 1
-                await asyncio.sleep(2)
+                title_tag = card.find("h2")
+                location_tag = card.find("i", {"data-icon-name": "POI"})
+                location_span = location_tag.find_next("span") if location_tag else None
+                date_tag = card.find("i", {"data-icon-name": "Clock"})
+                date_span = date_tag.find_next("span") if date_tag else None
+                parent_div = card.find_parent("div", attrs={"aria-label": re.compile(r"Job item \d+")})
+                link_tag = card.find("a", href=re.compile(r"/global/en/job/\d+/"))
+
+                cards.append({
+                    "title": title_tag.get_text(strip=True) if title_tag else None,
+                    "location": location_span.get_text(strip=True) if location_span else None,
+                    "date": date_span.get_text(strip=True) if date_span else None,
+                    "item_label": parent_div.get("aria-label") if parent_div else None,
+                    "href": link_tag["href"] if link_tag else None,
+                    "link_text": link_tag.get_text(strip=True) if link_tag else None,
+                })
 
             except Exception as e:
-                print(f"❌ Error on Microsoft page {page_num}: {e}", file=sys.stderr)
-                break  # ✅ Break loop if page fails badly
-
-    finally:
-        await browser.close()
-        print(f"Microsoft scraper finished. Found {new_jobs_found_overall} new jobs overall.")
+                print(f"❌ Error processing job card: {e}", file=sys.stderr)
+                continue
+
+    return cards
+
+def build_cards(raw_cards):
+    """Turn raw card fields into ``{id, url, title, location, date}`` dicts."""
+    cards = []
+
+    for raw in raw_cards:
+        title = raw.get("title") or "Unknown Title"
+        location_text = raw.get("location") or "Unknown Location"
+        date_text = raw.get("date") or "Unknown Date"
+
+        job_id = None
+        match = re.search(r"Job item (\d+)", raw.get("item_label") or "")
+        if match:
+            job_id = match.group(1)
+
+        job_url = None
+        if raw.get("href"):
+            job_url = f"https://jobs.careers.microsoft.com{raw['href']}"
+            if title == "Unknown Title":
+                title = raw.get("link_text") or "Unknown Title"
+
+        if not job_url and job_id:
+            slug = title.lower().replace(" ", "-").replace("–", "-").replace("&", "").replace(",", "").replace("’", "").replace(":", "")
+            slug = re.sub(r"[^a-z0-9\-]", "", slug)
+            slug = slug[:80]
+            job_url = f"https://jobs.careers.microsoft.com/global/en/job/{job_id}/{slug}"
+
+        if not job_url:
+            print(f"⚠️ Skipping card (no URL): {title} — {location_text}")
+            continue
+
+        id_match = JOB_ID_PATTERN.search(job_url)
+        job_id = id_match.group(1) if id_match else job_id
+
+        cards.append({"id": job_id, "url": job_url, "title": title, "location": location_text, "date": date_text})
+
+    return cards
+
+def parse_job_cards(content):
+    return build_cards(parse_raw_cards(content))
+
+async def extract_job_cards(page):
+    import dom_extract
+    return build_cards(await dom_extract.extract(page, EXTRACT_CARDS_JS, parse_raw_cards))
+
+# --- Source ---
+@sources.register("microsoft")
+class MicrosoftSource:
+    """Microsoft careers search API, with the careers site in Chromium as a fallback."""
+
+    quiet_first_run = True
+
+    def __init__(self, name, options):
+        self.name = name
+        self.company = options.get("company", "Microsoft")
+        self.browser_fallback = settings.config.getboolean(
+            f"source:{name}", "browser_fallback", fallback=BROWSER_FALLBACK
+        )
+        self.options = options
+        self._mark = None
+
+    def record(self, card):
+        job_url, title, location_text, date_text = card["url"], card["title"], card["location"], card["date"]
+        return sources.JobRecord(
+            source=self.name,
+            # The job number is stable across URL slugs and title edits; the label-based key is a last resort
+            job_id=job_identity.canonical_id(card["id"], job_url, fallback=f"{job_url}::{title} — {location_text}"),
+            company=self.company,
+            title=title,
+            location=location_text,
+            url=job_url,
+            posted=None if date_text == "Unknown Date" else date_text,
+            details=card.get("details") or {},
+        )
+
+    async def page_records(self, scraper, mark):
+        """Records of each page ``scraper`` yields, until ``mark`` (if any) says the rest is known."""
+        async with aclosing(scraper) as pages:
+            async for cards in pages:
+                # Checked before the records are yielded, since storing them makes them known
+                records = [self.record(card) for card in cards]
+                more = mark is None or mark.check_page(records)
+                for record in records:
+                    yield record
+                if not more:
+                    break
+
+    async def fetch(self):
+        print("Microsoft scraper started.")
+        self.complete = False
+        # o=Recent: once a page only lists known postings, the pages after it are known too
+        self._mark = mark = high_water.HighWaterMark.from_options(self.name, self.options)
+        if mark.full_sweep:
+            print("Microsoft: full sweep of every result page.")
+        listed = 0
+        try:
+            async for record in self.page_records(scrape_api(self.name), mark):
+                listed += 1
+                yield record
+            # The API pages through the whole result set unless it was cut at MAX_API_PAGES (or came back empty)
+            self.complete = 0 < listed < MAX_API_PAGES * PAGE_SIZE and not mark.stopped_early
+            return
+        except Exception as e:
+            print(f"❌ Error querying Microsoft search API: {e}", file=sys.stderr)
+            if not self.browser_fallback:
+                return
+
+        # Jobs the API already returned are skipped by the seen store. They would also look known
+        # to the mark, so after a partial API run the careers site is read to the end.
+        print("Falling back to the Microsoft careers site in Chromium...")
+        async for record in self.page_records(scrape_browser(), mark if listed == 0 else None):
+            yield record
+
+    async def commit(self):
+        if self._mark is not None:
+            self._mark.save(reached_end=self.complete)
+            self._mark = None
 
 # --- Standalone run ---
 if __name__ == "__main__":
     print("Running Microsoft scraper standalone...")
-    asyncio.run(main())
+    sources.run_once(SOURCE)
@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+import metrics
+import seen_store
+import settings
+
+print = functools.partial(print, flush=True)
+
+OUTBOX_DB = seen_store.DB_FILE
+MIN_INTERVAL = settings.getfloat('notifications', 'min_interval', 1.1)  # Telegram allows ~1 message/sec per chat
+DIGEST_THRESHOLD = settings.getint('notifications', 'digest_threshold', 5)  # pending messages before coalescing
+MAX_ATTEMPTS = settings.getint('notifications', 'max_attempts', 5)
+MAX_PENDING = settings.getint('notifications', 'max_pending', 1000)  # outbox bound; oldest are dropped beyond it
+RETRY_DELAY = 30  # seconds to wait after a failed delivery
+IDLE_POLL = 60  # seconds between outbox checks when nobody wakes the worker
+MAX_MESSAGE_LENGTH = 4000  # Telegram's hard limit is 4096 characters
+
+OUTBOX_DEPTH = metrics.gauge("notification_outbox_depth", "Notifications waiting in the outbox")
+DELIVERIES = metrics.counter("notification_deliveries_total", "Telegram delivery attempts by result")
+DELIVERED_MESSAGES = metrics.counter("notification_messages_delivered_total", "Queued messages delivered (a digest counts each)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    message  TEXT NOT NULL,
+    created  TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_local = threading.local()
+_loop = None
+_wake = None
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(OUTBOX_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+# --- Producer side (any thread) ---
+def enqueue(message):
+    """Persist a message in the outbox and wake the worker; never waits on delivery."""
+    with _connect() as conn:
+        row_id = conn.execute(
+            "INSERT INTO outbox (message, created) VALUES (?, ?)",
+            (message, datetime.now().isoformat(timespec="seconds")),
+        ).lastrowid
+        dropped = conn.execute("DELETE FROM outbox WHERE id <= ?", (row_id - MAX_PENDING,)).rowcount
+    if dropped:
+        print(f"⚠️ Notification outbox is full, dropped {dropped} oldest messages.", file=sys.stderr)
+    if _loop is not None and _wake is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+def pending_count():
+    return _connect().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+# --- Batching ---
+def next_batch():
+    """Pick what to send next: one message, or a digest once a burst has built up.
+
+    Returns ``(ids, text)`` or None when the outbox is empty.
+    """
+    rows = _connect().execute(
+        "SELECT id, message FROM outbox ORDER BY id LIMIT ?", (DIGEST_THRESHOLD * 10,)
+    ).fetchall()
+    if not rows:
+        return None
+    if len(rows) < DIGEST_THRESHOLD:
+        row_id, message = rows[0]
+        return [row_id], message[:MAX_MESSAGE_LENGTH]
+
+    ids, parts, length = [], [], 0
+    for row_id, message in rows:
+        part = message.strip()
+        if parts and length + len(part) + 40 > MAX_MESSAGE_LENGTH:
+            break
+        ids.append(row_id)
+        parts.append(part)
+        length += len(part) + 5
+    text = f"🗞 {len(parts)} new jobs:\n\n" + "\n\n———\n\n".join(parts)
+    return ids, text[:MAX_MESSAGE_LENGTH]
+
+def _delivered(ids):
+    with _connect() as conn:
+        conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+
+def _failed(ids):
+    """Count a failed attempt; drop messages that keep failing so they can't block the queue."""
+    with _connect() as conn:
+        conn.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", [(row_id,) for row_id in ids])
+        dropped = conn.execute("DELETE FROM outbox WHERE attempts >= ?", (MAX_ATTEMPTS,)).rowcount
+    if dropped:
+        print(f"❌ Dropped {dropped} notifications after {MAX_ATTEMPTS} failed attempts.", file=sys.stderr)
+
+def _send_next(deliver):
+    batch = next_batch()
+    if batch is None:
+        return None
+    ids, text = batch
+    if deliver(text):
+        _delivered(ids)
+        DELIVERIES.inc(result="ok")
+        DELIVERED_MESSAGES.inc(len(ids))
+        return True
+    _failed(ids)
+    DELIVERIES.inc(result="failed")
+    return False
+
+@metrics.on_collect
+def _collect():
+    OUTBOX_DEPTH.set(pending_count())
+
+# --- Consumer side ---
+async def run_worker(deliver):
+    """Deliver the outbox forever, at most one message every ``MIN_INTERVAL`` seconds.
+
+    ``deliver(text)`` is a blocking sender returning True on success; it runs
+    on a worker thread so the event loop (and the scrapers) never wait on it.
+    """
+    global _loop, _wake
+    _loop = asyncio.get_running_loop()
+    _wake = asyncio.Event()
+
+    while True:
+        _wake.clear()  # before reading the outbox, so an enqueue racing with this pass still wakes us
+        try:
+            sent = await asyncio.to_thread(_send_next, deliver)
+        except Exception as e:
+            print(f"❌ Notification worker error: {e}", file=sys.stderr)
+            sent = False
+
+        if sent is None:
+            try:
+                await asyncio.wait_for(_wake.wait(), IDLE_POLL)
+            except asyncio.TimeoutError:
+                pass
+        elif sent:
+            await asyncio.sleep(MIN_INTERVAL)
+        else:
+            await asyncio.sleep(RETRY_DELAY)
+
+def drain(deliver):
+    """Synchronously deliver everything pending, for standalone scraper runs."""
+    while True:
+        sent = _send_next(deliver)
+        if sent is None:
+            return
+        if not sent:
+            print(f"⚠️ {pending_count()} notifications left in the outbox for the next run.", file=sys.stderr)
+            return
+        time.sleep(MIN_INTERVAL)
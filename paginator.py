@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import sys
+import time
+from pyppeteer.errors import TimeoutError as PageTimeoutError
+import browser_pool
+import memory_guard
+import metrics
+import replay
+import settings
+import tor_circuits
+
+print = functools.partial(print, flush=True)
+
+PAGE_CONCURRENCY = memory_guard.cap(settings.getint('pagination', 'concurrency', 2), 1)
+POLITENESS_DELAY = settings.getfloat('pagination', 'politeness_delay', 1.5)  # min seconds between page loads
+MAX_PAGES = settings.getint('pagination', 'max_pages', 50)
+NAVIGATION_TIMEOUT = 30000  # ms
+READY_TIMEOUT = settings.getint('pagination', 'ready_timeout_ms', 15000)
+BLOCK_URL_MARKERS = ("captcha", "/checkpoint")  # where sites redirect suspected bots
+
+PAGE_SECONDS = metrics.histogram("page_stage_seconds", "Result page load time by stage (navigation, ready, extract)")
+PAGE_CARDS = metrics.histogram("page_cards", "Job cards extracted per result page", metrics.COUNT_BUCKETS)
+
+class Throttle:
+    """Spaces out the start of consecutive page loads by at least ``delay`` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._last_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            wait_for = self._last_start + self.delay - time.monotonic()
+            if wait_for > 0:
+                await asyncio.sleep(wait_for)
+            self._last_start = time.monotonic()
+
+async def load_page(manager, throttle, url, ready_selector, extract, label="page"):
+    """Load one results page in a borrowed tab and return ``extract(tab)``.
+
+    A page whose ``ready_selector`` never appears is treated as empty.
+    """
+    async with manager.page() as tab:
+        await throttle.wait()
+        start = time.monotonic()
+        try:
+            response = await tab.goto(replay.rewrite_url(url), timeout=NAVIGATION_TIMEOUT)
+        except Exception:
+            browser_pool.record_load(None, ok=False)
+            metrics.trace("page_load", site=label, url=url, status="navigation_failed")
+            raise
+        navigated = time.monotonic()
+        PAGE_SECONDS.observe(navigated - start, site=label, stage="navigation")
+        browser_pool.record_load(navigated - start, ok=response is None or response.status < 400)
+        if response is not None and response.status in tor_circuits.BLOCK_STATUSES:
+            browser_pool.report_block(f"HTTP {response.status} for {url}")
+            raise RuntimeError(f"HTTP {response.status}")
+        if any(marker in tab.url for marker in BLOCK_URL_MARKERS):
+            browser_pool.report_block(f"redirected to {tab.url}")
+            raise RuntimeError("redirected to a captcha")
+        try:
+            await tab.waitForSelector(ready_selector, timeout=READY_TIMEOUT)
+        except PageTimeoutError:
+            metrics.trace("page_load", site=label, url=url, status="not_ready", seconds=round(time.monotonic() - start, 3))
+            return []
+        ready = time.monotonic()
+        PAGE_SECONDS.observe(ready - navigated, site=label, stage="ready")
+        if replay.recorder is not None:
+            replay.recorder.capture_page(url, await tab.content())
+        items = await extract(tab)
+        done = time.monotonic()
+        PAGE_SECONDS.observe(done - ready, site=label, stage="extract")
+        PAGE_CARDS.observe(len(items), site=label)
+        metrics.trace("page_load", site=label, url=url, status="ok", cards=len(items),
+                      navigation=round(navigated - start, 3), ready=round(ready - navigated, 3),
+                      extract=round(done - ready, 3))
+        return items
+
+async def prefetch_pages(label, url_for_page, ready_selector, extract,
+                         concurrency=PAGE_CONCURRENCY, delay=POLITENESS_DELAY, manager=None):
+    """Yield ``(page_num, items)`` in page order while later pages load ahead.
+
+    Up to ``concurrency`` pages are in flight at once. ``items`` is whatever
+    ``extract`` returned, or ``None`` if the page failed to load. Iteration
+    stops after the first empty page; wrap the generator in
+    ``contextlib.aclosing`` so that breaking out early cancels the pages
+    still loading.
+    """
+    manager = manager or browser_pool.get_manager()
+    throttle = Throttle(delay)
+    pending = {}
+    next_to_start = 1
+
+    async def fetch(page_num):
+        url = url_for_page(page_num)
+        print(f"🔗 Loading {label} page {page_num}: {url}")
+        return await load_page(manager, throttle, url, ready_selector, extract, label=label)
+
+    def fill():
+        nonlocal next_to_start
+        while len(pending) < concurrency and next_to_start <= MAX_PAGES:
+            pending[next_to_start] = asyncio.ensure_future(fetch(next_to_start))
+            next_to_start += 1
+
+    try:
+        page_num = 1
+        fill()
+        while page_num in pending:
+            task = pending.pop(page_num)
+            try:
+                items = await task
+            except Exception as e:
+                print(f"❌ Error loading {label} page {page_num}: {e}", file=sys.stderr)
+                items = None
+            yield page_num, items
+            if items is not None and not items:
+                if page_num == 1:
+                    browser_pool.report_block(f"empty first {label} page")
+                return
+            page_num += 1
+            fill()
+    finally:
+        for task in pending.values():
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending.values(), return_exceptions=True)
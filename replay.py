@@ -0,0 +1,180 @@
+"""Record live career-site traffic and replay it from a local stub server.
+
+    python replay.py record [source ...]   # run sources live, save fixtures/replay/<source>.jsonl
+    python replay.py serve [--port 8765]   # serve the recordings
+
+While ``[replay] stub_url`` points at a running stub, http_client and the
+browser paginator send every request there instead of to the real site,
+so any scraper (or bench_replay.py) runs offline against the recording.
+"""
+import argparse
+import base64
+import functools
+import glob
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import settings
+
+print = functools.partial(print, flush=True)
+
+FIXTURES_DIR = settings.get('replay', 'fixtures_dir', os.path.join('fixtures', 'replay'))
+STUB_URL = settings.get('replay', 'stub_url', '').rstrip('/')  # empty: talk to the real sites
+SCRIPT_TAG = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+
+# --- Request keys ---
+def request_key(method, url):
+    """``METHOD host/path?sorted-query``, the same for the live URL and its stub rewrite."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.hostname}{parts.path or '/'}" + (f"?{query}" if query else "")
+
+def rewrite_url(url):
+    """``https://host/path?q`` -> ``<stub_url>/host/path?q`` while replaying, else unchanged."""
+    if not STUB_URL:
+        return url
+    parts = urlsplit(url)
+    return f"{STUB_URL}/{parts.hostname}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+# --- Recording ---
+class Recorder:
+    """Appends the HTTP responses and rendered result pages of one source's run to a JSON-lines file.
+
+    Only requests made on behalf of ``source`` are captured, so nothing else
+    the process sends (Telegram, the TOR check) ends up in a fixture.
+    """
+
+    def __init__(self, path, source=None):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "w").close()
+
+    def _write(self, key, status, content_type, body):
+        entry = {"key": key, "status": status, "content_type": content_type,
+                 "body": base64.b64encode(body).decode("ascii")}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.count += 1
+
+    def capture_response(self, method, response):
+        body = response.content
+        if response.raw is not None and not hasattr(response.raw, "getvalue"):
+            # Streamed responses are read here, so give the caller a rewound copy to stream from
+            response.raw = io.BytesIO(body)
+        self._write(request_key(method, response.request.url), response.status_code,
+                    response.headers.get("Content-Type", "application/octet-stream"), body)
+
+    def capture_page(self, url, html):
+        # Scripts are dropped so the replayed page is the rendered DOM, not an app that re-renders
+        self._write(request_key("GET", url), 200, "text/html; charset=utf-8", SCRIPT_TAG.sub("", html).encode("utf-8"))
+
+recorder = None  # set while recording; http_client and paginator report to it
+
+# --- Stub server ---
+def load_fixtures(directory=FIXTURES_DIR):
+    responses = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                # The first recording of a URL wins, like the first page a scraper saw
+                responses.setdefault(entry["key"], (entry["status"], entry["content_type"], base64.b64decode(entry["body"])))
+    return responses
+
+def make_handler(responses):
+    class StubHandler(BaseHTTPRequestHandler):
+        def _serve(self):
+            host, _, rest = self.path.lstrip("/").partition("/")
+            key = request_key(self.command, f"https://{host}/{rest}")
+            if self.headers.get("Content-Length"):
+                self.rfile.read(int(self.headers["Content-Length"]))
+            status, content_type, body = responses.get(key, (404, "text/plain", b"not recorded"))
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def start_stub(port=0, directory=FIXTURES_DIR):
+    """Serve the recordings from a daemon thread; returns ``(server, base_url)``."""
+    responses = load_fixtures(directory)
+    if not responses:
+        raise RuntimeError(f"No recordings in {directory}, run 'python replay.py record' first")
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(responses))
+    threading.Thread(target=server.serve_forever, name="replay-stub", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🎞 Replaying {len(responses)} recorded responses at {base_url}")
+    return server, base_url
+
+def record(names=None):
+    """Run each source once against the live sites and save what it fetched.
+
+    The sources run against a scratch seen store, outbox and archive with
+    notifications off, so every page is fetched and nothing real is touched
+    or sent. Call it before the scrapers are imported: they read these
+    settings at import time.
+    """
+    global recorder
+    workdir = tempfile.mkdtemp(prefix="replay_record_")
+    settings.config.read_dict({
+        "settings": {"notifications_enabled": "false"},
+        "seen_store": {"path": os.path.join(workdir, "outbox.db"), "bloom_path": os.path.join(workdir, "outbox.bloom")},
+        "history": {"path": os.path.join(workdir, "archive")},
+    })
+    import browser_pool
+    import seen_store
+    import sources
+    for name in names or sources.enabled_source_names():
+        # An empty store every time: no watermark or high-water mark cuts the run short
+        seen_store._store = seen_store.SeenStore(
+            os.path.join(workdir, f"{name}.db"), os.path.join(workdir, f"{name}.bloom")
+        )
+        recorder = Recorder(os.path.join(FIXTURES_DIR, f"{name}.jsonl"), source=name)
+        try:
+            browser_pool.run(lambda: sources.run_source(sources.build_source(name)))
+        finally:
+            print(f"💾 Recorded {recorder.count} responses for {name} in {recorder.path}")
+            recorder = None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["record", "serve"])
+    parser.add_argument("sources", nargs="*", help="sources to record (default: all enabled)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        if STUB_URL:
+            sys.exit("[replay] stub_url is set, clear it to record from the live sites.")
+        import replay  # the module http_client reports to, not this __main__ copy
+        replay.record(args.sources)
+    else:
+        try:
+            server, base_url = start_stub(args.port)
+        except RuntimeError as e:
+            sys.exit(f"❌ {e}")
+        print(f"Set stub_url = {base_url} in the [replay] section to scrape from it. Ctrl+C to stop.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+import functools
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+import metrics
+import settings
+
+print = functools.partial(print, flush=True)
+
+FILTER_ENABLED = settings.getboolean('resource_filter', 'enabled', True)
+BLOCKED_RESOURCE_TYPES = {
+    t.strip() for t in settings.get('resource_filter', 'blocked_types', 'image, media, font, stylesheet').split(',') if t.strip()
+}
+
+# Resource types a site still needs even though they are blocked elsewhere
+SITE_ALLOWED_TYPES = {
+    "www.metacareers.com": set(),
+    "jobs.careers.microsoft.com": set(),
+}
+
+# Analytics/ads hosts that never carry job data (matched as host suffixes)
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "bat.bing.com",
+    "clarity.ms",
+    "js.monitor.azure.com",
+    "adsrvr.org",
+    "demdex.net",
+    "omtrdc.net",
+)
+
+BLOCKED_REQUESTS = metrics.counter("browser_blocked_requests_total", "Browser sub-requests aborted, by site and kind")
+ALLOWED_REQUESTS = metrics.counter("browser_allowed_requests_total", "Browser sub-requests let through, by site")
+BROWSER_BYTES = metrics.counter("browser_bytes_total", "Bytes the browser transferred, by site")
+
+# Per-site counters: blocked requests by type, allowed requests, bytes actually transferred
+stats = defaultdict(lambda: {"blocked": Counter(), "allowed": 0, "bytes": 0})
+
+def _host(url):
+    return urlparse(url).hostname or ""
+
+def is_tracker(host):
+    return any(host == d or host.endswith("." + d) for d in TRACKER_DOMAINS)
+
+def should_block(site, resource_type, url):
+    """Decide whether a sub-request of a page on ``site`` is worth downloading."""
+    if resource_type == "document":
+        return False
+    if is_tracker(_host(url)):
+        return True
+    return resource_type in BLOCKED_RESOURCE_TYPES and resource_type not in SITE_ALLOWED_TYPES.get(site, set())
+
+async def _handle_request(tab, request):
+    site = _host(tab.url) or _host(request.url)
+    try:
+        if should_block(site, request.resourceType, request.url):
+            kind = "tracker" if is_tracker(_host(request.url)) else request.resourceType
+            stats[site]["blocked"][kind] += 1
+            BLOCKED_REQUESTS.inc(site=site, kind=kind)
+            await request.abort()
+        else:
+            stats[site]["allowed"] += 1
+            ALLOWED_REQUESTS.inc(site=site)
+            await request.continue_()
+    except Exception:
+        pass  # request already handled, or the tab closed mid-flight
+
+def _count_bytes(tab, event):
+    site, size = _host(tab.url), int(event.get("encodedDataLength", 0))
+    stats[site]["bytes"] += size
+    if site:
+        BROWSER_BYTES.inc(size, site=site)
+
+async def install(tab):
+    """Enable request interception on a freshly opened tab."""
+    if not FILTER_ENABLED:
+        return
+    await tab.setRequestInterception(True)
+    tab.on('request', lambda request: asyncio.ensure_future(_handle_request(tab, request)))
+    # encodedDataLength is the on-the-wire size, including headers and compression
+    tab._client.on('Network.loadingFinished', lambda event: _count_bytes(tab, event))
+
+def report(reset=True):
+    """Print the per-site counters collected since the last report."""
+    for site, counters in sorted(stats.items()):
+        if not site:  # about:blank between borrows
+            continue
+        blocked = counters["blocked"]
+        details = ", ".join(f"{kind}={count}" for kind, count in blocked.most_common())
+        print(f"  🧹 {site}: blocked {sum(blocked.values())} requests ({details or 'none'}), "
+              f"allowed {counters['allowed']}, downloaded {counters['bytes'] / 1024:.0f} KB")
+    if reset:
+        stats.clear()
@@ -0,0 +1,143 @@
+import functools
+import random
+import threading
+import time
+import metrics
+import seen_store
+import settings
+
+print = functools.partial(print, flush=True)
+
+BASE_INTERVAL = settings.getint('scheduler', 'base_interval', 600)  # seconds; also sets the total poll budget
+MIN_INTERVAL = settings.getint('scheduler', 'min_interval', 120)
+MAX_INTERVAL = settings.getint('scheduler', 'max_interval', 3600)
+JITTER = settings.getfloat('scheduler', 'jitter', 0.2)  # +/- fraction of the interval
+TARGET_NEW_PER_POLL = settings.getfloat('scheduler', 'target_new_per_poll', 1.0)
+MAX_BUSY_FRACTION = settings.getfloat('scheduler', 'max_busy_fraction', 0.25)  # of the interval spent fetching
+HISTORY_DAYS = 7  # seen-store history used to seed each source's posting rate
+EWMA_ALPHA = 0.3
+
+POLL_INTERVAL = metrics.gauge("poll_interval_seconds", "Current poll interval of each source")
+POSTING_RATE = metrics.gauge("posting_rate_per_day", "Estimated new postings per day of each source")
+
+class SourceSchedule:
+    """Adapts how often one source is polled to how often it posts new jobs.
+
+    The interval aims at ``target_new_per_poll`` new jobs per poll given the
+    source's posting rate (an EWMA, seeded from the last week of the seen
+    store), is never shorter than the fetch itself allows
+    (``max_busy_fraction``), doubles after a failure, and stays within the
+    source's min/max bounds.
+    """
+
+    def __init__(self, name, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, store=None):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = float(BASE_INTERVAL)
+        self.cost = None  # EWMA of the fetch duration, seconds
+        self.failures = 0
+        self.last_poll = None
+        store = store or seen_store.get_store()
+        recent = store.recent_count(name, HISTORY_DAYS)
+        self.rate = recent / (HISTORY_DAYS * 86400)  # new jobs per second
+        # Everything is polled right away at start, spread over a few seconds rather than all at once
+        self.next_run = time.monotonic() + random.uniform(0, JITTER) * self.min_interval
+
+    @classmethod
+    def from_options(cls, name, options, store=None):
+        return cls(
+            name,
+            min_interval=int(options.get("min_interval", MIN_INTERVAL)),
+            max_interval=int(options.get("max_interval", MAX_INTERVAL)),
+            store=store,
+        )
+
+    def record(self, new_jobs, elapsed, ok=True):
+        """Fold one poll into the estimates and return the delay until the next one."""
+        self.cost = elapsed if self.cost is None else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.cost
+        now = time.monotonic()
+        if ok:
+            self.failures = 0
+            # The first poll also finds whatever was posted while we weren't running, so it isn't a rate sample
+            if self.last_poll is not None:
+                observed = new_jobs / max(now - self.last_poll, 1.0)
+                self.rate = EWMA_ALPHA * observed + (1 - EWMA_ALPHA) * self.rate
+            self.last_poll = now
+            interval = TARGET_NEW_PER_POLL / self.rate if self.rate > 0 else self.max_interval
+        else:
+            self.failures += 1
+            interval = self.interval * 2
+        interval = max(interval, self.cost / MAX_BUSY_FRACTION)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        POLL_INTERVAL.set(round(self.interval), source=self.name)
+        POSTING_RATE.set(round(self.rate * 86400, 2), source=self.name)
+        return self.reschedule()
+
+    def reschedule(self):
+        delay = self.interval * random.uniform(1 - JITTER, 1 + JITTER)
+        self.next_run = time.monotonic() + delay
+        return delay
+
+class Scheduler:
+    """Per-source schedules under one budget: never more polls in total than every
+    source on a flat ``base_interval`` loop would make."""
+
+    def __init__(self, schedules):
+        self.schedules = {schedule.name: schedule for schedule in schedules}
+        self._lock = threading.Lock()
+
+    def delay(self, name):
+        """Seconds until ``name`` is due."""
+        return max(0.0, self.schedules[name].next_run - time.monotonic())
+
+    def record(self, name, new_jobs, elapsed, ok=True):
+        with self._lock:
+            schedule = self.schedules[name]
+            schedule.record(new_jobs, elapsed, ok)
+            if self._enforce_budget():
+                schedule.reschedule()
+            return schedule.next_run - time.monotonic()
+
+    def add(self, schedule):
+        """Start scheduling a source enabled while running; a schedule it had before is kept."""
+        with self._lock:
+            return self.schedules.setdefault(schedule.name, schedule)
+
+    def remove(self, name):
+        with self._lock:
+            self.schedules.pop(name, None)
+
+    def update_bounds(self, name, options):
+        """Apply a source's reloaded min/max interval without losing its rate and cost estimates."""
+        with self._lock:
+            schedule = self.schedules[name]
+            schedule.min_interval = int(options.get("min_interval", MIN_INTERVAL))
+            schedule.max_interval = int(options.get("max_interval", MAX_INTERVAL))
+            schedule.interval = min(max(schedule.interval, schedule.min_interval), schedule.max_interval)
+
+    def postpone(self, name):
+        """Skip a poll without a sample, e.g. while another node polls the source; returns the delay."""
+        with self._lock:
+            return self.schedules[name].reschedule()
+
+    def _enforce_budget(self):
+        """Stretch every interval by the same factor if the sources together poll too often.
+
+        The others pick up their new interval when they next reschedule.
+        """
+        budget = len(self.schedules) / BASE_INTERVAL  # polls per second
+        rate = sum(1 / s.interval for s in self.schedules.values())
+        if rate <= budget:
+            return False
+        factor = rate / budget
+        for schedule in self.schedules.values():
+            schedule.interval = min(schedule.interval * factor, schedule.max_interval)
+        return True
+
+    def report(self):
+        for name, schedule in sorted(self.schedules.items()):
+            cost = f"{schedule.cost:.0f}s" if schedule.cost is not None else "n/a"
+            print(f"  ⏱️ {name:<10} every {schedule.interval / 60:5.1f} min, "
+                  f"{schedule.rate * 86400:5.1f} new/day, fetch {cost}, "
+                  f"next in {max(0, schedule.next_run - time.monotonic()) / 60:.1f} min")
@@ -0,0 +1,437 @@
+import functools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from bloom import BloomFilter
+import memory_guard
+import metrics
+import settings
+
+print = functools.partial(print, flush=True)
+
+DB_FILE = settings.get('seen_store', 'path', 'seen_jobs.db')
+BLOOM_FILE = settings.get('seen_store', 'bloom_path', 'seen_jobs.bloom')
+BLOOM_CAPACITY = settings.getint('seen_store', 'bloom_capacity', 100000)
+BLOOM_ERROR_RATE = settings.getfloat('seen_store', 'bloom_error_rate', 0.001)
+CACHE_SIZE = memory_guard.cap(settings.getint('seen_store', 'cache_size', 4096), 512)
+# New jobs buffered before a write; 0 writes once per scraper run
+FLUSH_EVERY = settings.getint('seen_store', 'flush_every', 100 if memory_guard.LOW_MEMORY else 0)
+TTL_DAYS = settings.getint('seen_store', 'ttl_days', 180)  # 0 keeps postings forever
+REPOST_WINDOW_DAYS = settings.getint('seen_store', 'repost_window_days', 30)  # 0 disables fingerprint dedup
+# A posting missing from a partial listing still counts as open if it was listed this recently
+STILL_LISTED_DAYS = 2
+EXPIRY_INTERVAL = 24 * 3600  # seconds between expiry passes
+
+# Text files used before the SQLite store; imported once per source
+LEGACY_FILES = {
+    "google": "seen_jobs_google.txt",
+    "deepmind": "seen_jobs_deepmind.txt",
+    "meta": "seen_jobs_meta.txt",
+    "microsoft": "seen_jobs_microsoft.txt",
+}
+# Job numbers embedded in the URLs stored by the browser scrapers
+LEGACY_URL_ID_PATTERNS = {
+    "meta": re.compile(r"metacareers\.com/jobs/(\d+)"),
+    "microsoft": re.compile(r"/global/en/job/(\d+)"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_jobs (
+    source     TEXT NOT NULL,
+    job_id     TEXT NOT NULL,
+    title      TEXT,
+    location   TEXT,
+    url        TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT,
+    PRIMARY KEY (source, job_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_jobs_first_seen ON seen_jobs (first_seen);
+CREATE TABLE IF NOT EXISTS job_fingerprints (
+    fingerprint BLOB PRIMARY KEY,
+    source      TEXT NOT NULL,
+    job_id      TEXT NOT NULL,
+    first_seen  TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS http_validators (
+    url           TEXT PRIMARY KEY,
+    etag          TEXT,
+    last_modified TEXT,
+    updated       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    source  TEXT PRIMARY KEY,
+    value   TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+"""
+
+def now_iso():
+    return datetime.now().isoformat(timespec="seconds")
+
+def bloom_key(source, job_id):
+    return f"{source}\0{job_id}"
+
+class SeenStore:
+    """Seen jobs of every source in one SQLite database, keyed by (source, job_id).
+
+    Lookups go through a persisted Bloom filter first, so most unseen jobs
+    never touch the database, then a small LRU cache of recently confirmed
+    keys, then the primary key index. New jobs are buffered and written in
+    one transaction per ``flush()``, together with the ``last_seen`` time of
+    the stored jobs listed again (``touch()``). Postings no source has listed
+    for ``ttl_days`` are expired, which keeps the database and the filter's
+    fill level (and so its false-positive rate) roughly constant.
+
+    Next to the exact keys, a content fingerprint per job (see
+    job_identity.py) recognizes re-posts and the same job on another board.
+
+    Each thread gets its own connection and WAL mode lets the scrapers read
+    while another one writes.
+    """
+
+    def __init__(self, path=DB_FILE, bloom_path=BLOOM_FILE, ttl_days=TTL_DAYS):
+        self.path = path
+        self.bloom_path = bloom_path
+        self.ttl_days = ttl_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_fingerprints = {}
+        self._sightings = set()
+        self._cache = OrderedDict()
+        self._last_expiry = 0.0
+        self.stats = {"lookups": 0, "bloom_negatives": 0, "cache_hits": 0, "false_positives": 0}
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+        self.bloom = self._load_bloom()
+        self.import_legacy_files()
+        self.expire_old()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        if "last_seen" not in {row[1] for row in conn.execute("PRAGMA table_info(seen_jobs)")}:
+            conn.execute("ALTER TABLE seen_jobs ADD COLUMN last_seen TEXT")
+            # When they were last listed is unknown, so postings already stored count from the upgrade
+            conn.execute("UPDATE seen_jobs SET last_seen = ?", (now_iso(),))
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_jobs_last_seen ON seen_jobs (last_seen)")
+
+    # --- Bloom filter ---
+    def _row_count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM seen_jobs").fetchone()[0]
+
+    def _load_bloom(self):
+        bloom = BloomFilter.load(self.bloom_path, BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        # A filter that missed writes (crash, expiry, resize) would hide seen jobs, so rebuild it
+        if bloom is None or bloom.items != self._row_count():
+            bloom = self._rebuild_bloom()
+        return bloom
+
+    def _rebuild_bloom(self):
+        bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        for source, job_id in self._connect().execute("SELECT source, job_id FROM seen_jobs"):
+            bloom.add(bloom_key(source, job_id))
+        bloom.save(self.bloom_path)
+        print(f"🌸 Rebuilt seen-jobs Bloom filter with {bloom.items} keys ({len(bloom.bits) / 1024:.0f} KB).")
+        return bloom
+
+    def _remember(self, key):
+        self._cache[key] = True
+        self._cache.move_to_end(key)
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    # --- Lookups and writes ---
+    def contains(self, source, job_id):
+        key = bloom_key(source, job_id)
+        with self._lock:
+            self.stats["lookups"] += 1
+            if (source, job_id) in self._pending:
+                return True
+            if key not in self.bloom:
+                self.stats["bloom_negatives"] += 1
+                return False
+            if key in self._cache:
+                self.stats["cache_hits"] += 1
+                self._cache.move_to_end(key)
+                return True
+        row = self._connect().execute(
+            "SELECT 1 FROM seen_jobs WHERE source = ? AND job_id = ?", (source, job_id)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.stats["false_positives"] += 1
+                return False
+            self._remember(key)
+        return True
+
+    def count(self, source):
+        with self._lock:
+            pending = sum(1 for pending_source, _ in self._pending if pending_source == source)
+        row = self._connect().execute("SELECT COUNT(*) FROM seen_jobs WHERE source = ?", (source,)).fetchone()
+        return row[0] + pending
+
+    def recent_count(self, source, days):
+        """Jobs of ``source`` first seen in the last ``days`` days."""
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM seen_jobs WHERE source = ? AND first_seen >= ?", (source, since)
+        ).fetchone()[0]
+
+    def add(self, source, job_id, title=None, location=None, url=None, first_seen=None, fingerprint=None):
+        """Queue a job as seen; it is written on the next ``flush()``."""
+        first_seen = first_seen or now_iso()
+        with self._lock:
+            self._pending.setdefault((source, job_id), (title, location, url, first_seen))
+            if fingerprint is not None:
+                self._pending_fingerprints.setdefault(fingerprint, (source, job_id, first_seen))
+
+    def touch(self, source, job_id):
+        """Note that a stored job was listed again; its ``last_seen`` is updated on the next ``flush()``."""
+        with self._lock:
+            self._sightings.add((source, job_id))
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def find_fingerprint(self, fingerprint, window_days=REPOST_WINDOW_DAYS, run=None):
+        """Return ``(source, job_id)`` of a job with this fingerprint first seen within the window.
+
+        ``run`` is ``(source, start)`` of the run asking; jobs that source
+        stored since ``start`` don't count.
+        """
+        if window_days <= 0:
+            return None
+        run_source, run_start = run or (None, None)
+        with self._lock:
+            pending = self._pending_fingerprints.get(fingerprint)
+        if pending is not None and pending[0] != run_source:
+            return pending[:2]
+        since = (datetime.now() - timedelta(days=window_days)).isoformat(timespec="seconds")
+        return self._connect().execute(
+            "SELECT source, job_id FROM job_fingerprints WHERE fingerprint = ? AND first_seen >= ? "
+            "AND NOT (source = ? AND first_seen >= ?)",
+            (fingerprint, since, run_source, run_start or ""),
+        ).fetchone()
+
+    def listed_recently(self, source, job_id, days=STILL_LISTED_DAYS):
+        """Whether a stored job was listed within the last ``days`` days."""
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        return self._connect().execute(
+            "SELECT 1 FROM seen_jobs WHERE source = ? AND job_id = ? AND last_seen >= ?", (source, job_id, since)
+        ).fetchone() is not None
+
+    def backfill_fingerprints(self, source, fingerprint_fn):
+        """Fingerprint the stored jobs of ``source`` once, so the first fingerprinted run has history.
+
+        ``fingerprint_fn(title, location)`` returns the fingerprint; jobs
+        stored without a location (the old title::date keys) are skipped.
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM job_fingerprints WHERE source = ? LIMIT 1", (source,)).fetchone():
+            return 0
+        rows = conn.execute(
+            "SELECT job_id, title, location, first_seen FROM seen_jobs "
+            "WHERE source = ? AND title IS NOT NULL AND location IS NOT NULL",
+            (source,),
+        ).fetchall()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_fingerprints (fingerprint, source, job_id, first_seen) VALUES (?, ?, ?, ?)",
+                [(fingerprint_fn(title, location), source, job_id, first_seen) for job_id, title, location, first_seen in rows],
+            )
+        if rows:
+            print(f"🧬 Fingerprinted {len(rows)} stored {source} jobs.")
+        return len(rows)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            fingerprints, self._pending_fingerprints = self._pending_fingerprints, {}
+            sightings, self._sightings = self._sightings, set()
+        now = now_iso()
+        if sightings:
+            with self._connect() as conn:
+                # At most one write per posting and day, however often it is polled
+                conn.executemany(
+                    "UPDATE seen_jobs SET last_seen = ? WHERE source = ? AND job_id = ? AND last_seen < ?",
+                    [(now, source, job_id, now[:10]) for source, job_id in sightings],
+                )
+        if not pending:
+            return 0
+        rows = [(source, job_id, *fields, now) for (source, job_id), fields in pending.items()]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_jobs (source, job_id, title, location, url, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            inserted = conn.total_changes - before
+            # The first job with a fingerprint keeps it, re-posts point back to the original
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_fingerprints (fingerprint, source, job_id, first_seen) VALUES (?, ?, ?, ?)",
+                [(fingerprint, *fields) for fingerprint, fields in fingerprints.items()],
+            )
+        with self._lock:
+            for source, job_id, *_ in rows:
+                key = bloom_key(source, job_id)
+                self.bloom.add(key)
+                self._remember(key)
+            # The item count doubles as a consistency check against the table on the next start
+            self.bloom.items = self._row_count()
+            self.bloom.save(self.bloom_path)
+        if self.bloom.items > BLOOM_CAPACITY:
+            print(f"⚠️ Seen-jobs Bloom filter holds {self.bloom.items} keys (capacity {BLOOM_CAPACITY}); "
+                  f"raise bloom_capacity or lower ttl_days.", file=sys.stderr)
+        return inserted
+
+    # --- Incremental fetching state ---
+    def get_validators(self, url):
+        """Return ``{"etag", "last_modified"}`` saved for ``url`` (values may be None)."""
+        row = self._connect().execute(
+            "SELECT etag, last_modified FROM http_validators WHERE url = ?", (url,)
+        ).fetchone()
+        return {"etag": row[0], "last_modified": row[1]} if row else {"etag": None, "last_modified": None}
+
+    def set_validators(self, url, validators):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO http_validators (url, etag, last_modified, updated) VALUES (?, ?, ?, ?)",
+                (url, validators.get("etag"), validators.get("last_modified"), now_iso()),
+            )
+
+    def get_watermark(self, source):
+        row = self._connect().execute("SELECT value FROM watermarks WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, source, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO watermarks (source, value, updated) VALUES (?, ?, ?)",
+                (source, value, now_iso()),
+            )
+
+    # --- Expiry ---
+    def expire_old(self, force=False):
+        """Delete postings last listed more than ``ttl_days`` ago, at most once a day.
+
+        A posting that is still open keeps being listed, so it stays however
+        old it is; its fingerprint goes with it.
+        """
+        if self.ttl_days <= 0 or (not force and time.monotonic() - self._last_expiry < EXPIRY_INTERVAL):
+            return 0
+        self._last_expiry = time.monotonic()
+        cutoff = (datetime.now() - timedelta(days=self.ttl_days)).isoformat(timespec="seconds")
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM seen_jobs WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute(
+                "DELETE FROM job_fingerprints WHERE first_seen < ? AND NOT EXISTS "
+                "(SELECT 1 FROM seen_jobs WHERE seen_jobs.source = job_fingerprints.source "
+                "AND seen_jobs.job_id = job_fingerprints.job_id)",
+                (cutoff,),
+            )
+        if deleted:
+            print(f"🧹 Expired {deleted} seen jobs not listed since {cutoff[:10]}.")
+            # Bloom filters can't delete, so start a fresh one from what is left
+            with self._lock:
+                self._cache.clear()
+                self.bloom = self._rebuild_bloom()
+        return deleted
+
+    def report(self):
+        stats = self.stats
+        absent = stats["bloom_negatives"] + stats["false_positives"]
+        measured = stats["false_positives"] / absent if absent else 0.0
+        print(f"  🌸 Seen store: {stats['lookups']} lookups, {stats['bloom_negatives']} answered by the Bloom filter, "
+              f"{stats['cache_hits']} by the cache; false positives {stats['false_positives']} "
+              f"(measured {measured:.4%}, expected {self.bloom.expected_fp_rate():.4%}, {self.bloom.items} keys)")
+
+    # --- Legacy text files ---
+    def import_legacy_files(self, force=False):
+        """Import ``seen_jobs_*.txt`` for every source that has no rows yet."""
+        for source, path in LEGACY_FILES.items():
+            if os.path.exists(path) and (force or self.count(source) == 0):
+                imported = self.import_legacy_file(source, path)
+                print(f"📥 Imported {imported} seen {source} jobs from {path}.")
+
+    def import_legacy_file(self, source, path):
+        imported = 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = parse_legacy_line(source, line)
+                    if row:
+                        self.add(source, *row)
+                        imported += 1
+        except OSError as e:
+            print(f"❌ Error importing {path}: {e}", file=sys.stderr)
+        self.flush()
+        return imported
+
+def parse_legacy_line(source, line):
+    """Map one legacy line to ``(job_id, title, location, url, first_seen)``."""
+    line = line.strip()
+    if not line or "::" not in line:
+        return None
+
+    if source in LEGACY_URL_ID_PATTERNS:
+        # url::title — location::YYYY-MM-DD
+        parts = line.split("::")
+        url, label = parts[0], parts[1]
+        title, _, location = label.partition(" — ")
+        first_seen = parts[2] if len(parts) > 2 else now_iso()
+        match = LEGACY_URL_ID_PATTERNS[source].search(url)
+        job_id = match.group(1) if match else f"{url}::{label}"
+        return job_id, title, location or None, url, first_seen
+
+    # title::YYYY-MM-DD HH:MM (the creation date doubles as first-seen time)
+    title, _, created = line.rpartition("::")
+    first_seen = created.replace(" ", "T") if created and created != "Unknown" else now_iso()
+    return line, title, None, None, first_seen
+
+_store = None
+_store_lock = threading.Lock()
+
+STORE_LOOKUPS = metrics.gauge("seen_store_lookups", "Seen-store lookups since start, by where they were answered")
+BLOOM_KEYS = metrics.gauge("seen_store_bloom_keys", "Keys in the seen-jobs Bloom filter")
+
+@metrics.on_collect
+def _collect():
+    if _store is None:
+        return
+    stats = _store.stats
+    STORE_LOOKUPS.set(stats["bloom_negatives"], answered_by="bloom")
+    STORE_LOOKUPS.set(stats["cache_hits"], answered_by="cache")
+    STORE_LOOKUPS.set(stats["false_positives"], answered_by="false_positive")
+    STORE_LOOKUPS.set(stats["lookups"] - stats["bloom_negatives"] - stats["cache_hits"] - stats["false_positives"],
+                      answered_by="database")
+    BLOOM_KEYS.set(_store.bloom.items)
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SeenStore()
+    return _store
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["import"]:
+        SeenStore().import_legacy_files(force=True)
+    else:
+        print("Usage: python seen_store.py import")
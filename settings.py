@@ -0,0 +1,166 @@
+import configparser
+import os
+import re
+import sys
+
+# --- Shared config.ini access ---
+CONFIG_FILE = 'config.ini'
+config = configparser.ConfigParser(interpolation=None)  # URLs and regexes contain '%'
+
+# --- Schema ---
+# The type of every option the code reads; "*" covers sections whose keys are free-form
+# (host names, alias groups). config.ini is checked against it on start and on every reload.
+FILTER_OPTIONS = {
+    'include': str, 'exclude': str, 'title_pattern': 'regex', 'locations': str, 'seniority': str,
+    'max_age_days': int,
+}
+SOURCE_OPTIONS = {
+    'type': str, 'company': str, 'dedup_group': str, 'min_interval': int, 'max_interval': int,
+    'url': str, 'search_term': str, 'location': str, 'board': str, 'boards': str, 'browser_fallback': bool,
+    'lookahead_pages': int, 'full_sweep_hours': float,
+    **FILTER_OPTIONS,
+}
+SCHEMA = {
+    'settings': {'notifications_enabled': bool},
+    'sources': {'enabled': str},
+    'scheduler': {'base_interval': int, 'min_interval': int, 'max_interval': int, 'jitter': float,
+                  'target_new_per_poll': float, 'max_busy_fraction': float},
+    'ats': {'concurrency': int},
+    'filters': FILTER_OPTIONS,
+    'location_aliases': {'*': str},
+    'browser': {'executable_path': str, 'pool_size': int, 'max_rss_mb': int, 'proxy': str},
+    'memory': {'low_memory': bool, 'browser_max_rss_mb': int, 'rss_budget_mb': int, 'check_interval': float},
+    'pagination': {'concurrency': int, 'politeness_delay': float, 'ready_timeout_ms': int, 'max_pages': int,
+                   'lookahead_pages': int, 'full_sweep_hours': float},
+    'resource_filter': {'enabled': bool, 'blocked_types': str},
+    'microsoft': {'browser_fallback': bool},
+    'extraction': {'mode': ('script', 'html')},
+    'seen_store': {'path': str, 'bloom_path': str, 'bloom_capacity': int, 'bloom_error_rate': float,
+                   'cache_size': int, 'flush_every': int, 'ttl_days': int, 'repost_window_days': int},
+    'history': {'enabled': bool, 'path': str},
+    'http': {'tor_proxy': str, 'connect_timeout': float, 'read_timeout': float, 'max_retries': int,
+             'backoff_base': float, 'backoff_max': float, 'per_host_concurrency': int},
+    'http_hosts': {'*': int},
+    'workers': {'mode': ('inline', 'queue'), 'processes': int, 'queue_path': str},
+    'notifications': {'min_interval': float, 'digest_threshold': int, 'max_attempts': int, 'max_pending': int},
+    'metrics': {'port': int, 'host': str, 'trace_path': str, 'trace_max_mb': float},
+    'replay': {'fixtures_dir': str, 'stub_url': str},
+    'tor': {'control_port': int, 'socks_host': str, 'socks_port': int, 'sources': str, 'slow_latency': float,
+            'max_failure_rate': float},
+}
+
+def _check_value(kind, value):
+    """None if ``value`` is a valid ``kind``, else what was expected."""
+    try:
+        if kind is int:
+            int(value)
+        elif kind is float:
+            float(value)
+        elif kind is bool:
+            if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+                return "true or false"
+        elif kind == 'regex':
+            re.compile(value)
+        elif isinstance(kind, tuple) and value not in kind:
+            return " or ".join(kind)
+    except ValueError:
+        return "an integer" if kind is int else "a number"
+    except re.error as e:
+        return f"a valid regular expression ({e})"
+    return None
+
+def validate(parser):
+    """Check a parsed config against SCHEMA; returns ``(errors, warnings)`` as messages."""
+    errors, warnings = [], []
+    for section in parser.sections():
+        options = SOURCE_OPTIONS if section.startswith('source:') else SCHEMA.get(section)
+        if options is None:
+            warnings.append(f"Unknown section [{section}] in {CONFIG_FILE}, ignored.")
+            continue
+        for key, value in parser.items(section, raw=True):
+            kind = options.get(key, options.get('*'))
+            if kind is None:
+                warnings.append(f"Unknown option [{section}] {key}, ignored.")
+                continue
+            expected = _check_value(kind, value)
+            if expected is not None:
+                errors.append(f"[{section}] {key} = {value!r}: expected {expected}.")
+    return errors, warnings
+
+def _mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+_loaded_mtime = _mtime()
+
+try:
+    if os.path.exists(CONFIG_FILE):
+        config.read(CONFIG_FILE)
+        startup_errors, startup_warnings = validate(config)
+        for message in startup_warnings:
+            print(f"Warning: {message}", file=sys.stderr)
+        for message in startup_errors:
+            print(f"Warning: {message} Using the default.", file=sys.stderr)
+except configparser.Error as e:
+    print(f"Warning: Error reading '{CONFIG_FILE}'. Using default settings. Error: {e}", file=sys.stderr)
+
+def reload(check=None):
+    """Re-read CONFIG_FILE if it changed since it was loaded; returns True if the new one was applied.
+
+    ``check(parser)`` can add errors of its own. A file that doesn't parse or
+    validate is reported and the running config is kept. The new values
+    replace the old ones inside ``config`` itself, so everything reading
+    through this module sees them; constants modules computed at import keep
+    their values until a restart.
+    """
+    global _loaded_mtime
+    mtime = _mtime()
+    if mtime is None or mtime == _loaded_mtime:
+        return False
+    _loaded_mtime = mtime
+    fresh = configparser.ConfigParser(interpolation=None)
+    try:
+        fresh.read(CONFIG_FILE)
+    except configparser.Error as e:
+        print(f"❌ {CONFIG_FILE} changed but can't be parsed, keeping the running config: {e}", file=sys.stderr)
+        return False
+    errors, warnings = validate(fresh)
+    if check is not None:
+        errors += check(fresh)
+    for message in warnings:
+        print(f"Warning: {message}", file=sys.stderr)
+    if errors:
+        for message in errors:
+            print(f"❌ {message}", file=sys.stderr)
+        print(f"❌ {CONFIG_FILE} changed but has errors, keeping the running config.", file=sys.stderr)
+        return False
+    for section in config.sections():
+        config.remove_section(section)
+    config.read_dict(fresh)
+    return True
+
+def get(section, key, fallback=None):
+    return config.get(section, key, fallback=fallback)
+
+def getint(section, key, fallback):
+    try:
+        return config.getint(section, key, fallback=fallback)
+    except ValueError:
+        print(f"Warning: Invalid integer for [{section}] {key}, using {fallback}.", file=sys.stderr)
+        return fallback
+
+def getfloat(section, key, fallback):
+    try:
+        return config.getfloat(section, key, fallback=fallback)
+    except ValueError:
+        print(f"Warning: Invalid number for [{section}] {key}, using {fallback}.", file=sys.stderr)
+        return fallback
+
+def getboolean(section, key, fallback):
+    try:
+        return config.getboolean(section, key, fallback=fallback)
+    except ValueError:
+        print(f"Warning: Invalid boolean for [{section}] {key}, using {fallback}.", file=sys.stderr)
+        return fallback
@@ -0,0 +1,261 @@
+import asyncio
+import functools
+import importlib
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Collection, Dict, Optional, Protocol, Tuple
+import filters
+import history
+import job_identity
+import metrics
+import seen_store
+import settings
+import telegram as tel
+
+print = functools.partial(print, flush=True)
+
+SOURCE_SECONDS = metrics.histogram("source_run_seconds", "Duration of one full fetch of a source")
+JOBS = metrics.counter("jobs_total", "Fetched jobs by source and outcome (filtered, seen, rekeyed, duplicate, new)")
+
+# --- Job Records ---
+@dataclass
+class JobRecord:
+    """One posting, normalized across sources."""
+    source: str
+    job_id: str  # stable per source; the seen store is keyed by (source, job_id)
+    company: str
+    title: str
+    location: str
+    url: str
+    posted: Optional[str] = None  # display date, when the source has one
+    aliases: Tuple[str, ...] = ()  # keys the job was stored under before it had a canonical id
+    details: Dict[str, str] = field(default_factory=dict)  # other fields the site returns, kept in the history archive
+
+class Source(Protocol):
+    name: str
+    company: str
+    quiet_first_run: bool  # record but don't announce everything on the very first run
+    job_filter: filters.JobFilter  # set by build_source from [filters] and the source's section
+    dedup_group: Optional[str]  # sources sharing a group dedup each other's jobs; None groups by company
+    complete: bool  # set by fetch(): True if it listed every open posting, so the missing ones closed
+    still_listed: Collection[str]  # set by fetch() (optional): ids listed by unchanged parts it didn't download
+
+    def fetch(self) -> AsyncIterator[JobRecord]:
+        """Yield the postings currently listed (async generator)."""
+
+    async def commit(self) -> None:
+        """Persist incremental-fetch state once the fetched jobs are stored (optional)."""
+
+# --- Registry ---
+# Source type -> module defining it; modules are only imported once a source of that type is enabled
+SOURCE_MODULES = {
+    "meta": "meta",
+    "microsoft": "microsoft",
+    "google": "google",
+    "ats": "ats_boards",
+    "greenhouse": "ats_boards",
+    "lever": "ats_boards",
+    "ashby": "ats_boards",
+}
+SOURCE_TYPES = {}
+
+def register(type_name):
+    """Class decorator adding a source type to the registry."""
+    def decorator(cls):
+        SOURCE_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+def build_source(name):
+    """Instantiate the source configured in the ``[source:<name>]`` section.
+
+    The source and its compiled filter keep a copy of the options, so a
+    config reload only affects sources that are built again.
+    """
+    section = f"source:{name}"
+    if not settings.config.has_section(section):
+        raise ValueError(f"No [{section}] section in {settings.CONFIG_FILE}")
+    options = dict(settings.config[section])
+    type_name = options.get("type", name)
+    if type_name not in SOURCE_TYPES:
+        if type_name not in SOURCE_MODULES:
+            raise ValueError(f"Unknown source type '{type_name}' for {name}")
+        importlib.import_module(SOURCE_MODULES[type_name])  # and whatever it needs: Chromium, bs4...
+    source = SOURCE_TYPES[type_name](name, options)
+    source.job_filter = filters.compile_filter(options)
+    source.dedup_group = options.get("dedup_group") or None
+    source.config_key = config_key(name)
+    return source
+
+def config_key(name, parser=None):
+    """Everything a built source depends on; a source is rebuilt on reload when this changes."""
+    parser = parser or settings.config
+    return tuple(
+        tuple(sorted(parser.items(section, raw=True))) if parser.has_section(section) else None
+        for section in (f"source:{name}", "filters", "location_aliases")
+    )
+
+def check_config(parser):
+    """Errors in a config's ``[sources]`` that the schema can't see; for settings.reload()."""
+    errors = []
+    enabled = parser.get('sources', 'enabled', fallback='')
+    for name in (n.strip() for n in enabled.split(',') if n.strip()):
+        section = f"source:{name}"
+        if not parser.has_section(section):
+            errors.append(f"[sources] enables {name} but there is no [{section}] section.")
+            continue
+        type_name = parser.get(section, "type", fallback=name)
+        if type_name not in SOURCE_TYPES and type_name not in SOURCE_MODULES:
+            errors.append(f"[{section}] type = {type_name!r}: unknown source type.")
+    return errors
+
+def enabled_source_names():
+    return [n.strip() for n in settings.get('sources', 'enabled', '').split(',') if n.strip()]
+
+def enabled_sources():
+    sources = []
+    for name in enabled_source_names():
+        try:
+            sources.append(build_source(name))
+        except Exception as e:
+            print(f"❌ Skipping source {name}: {e}", file=sys.stderr)
+    return sources
+
+def option_lines(options, key, fallback=()):
+    """Read a multi-line (one value per line) option as a list."""
+    value = options.get(key)
+    if value is None:
+        return list(fallback)
+    return [line.strip() for line in value.splitlines() if line.strip()]
+
+# --- Pipeline ---
+def format_notification(record):
+    posted = f"\n🕒 Opened: {record.posted}" if record.posted else ""
+    return f"\n🔔 {record.company} Job: {record.title} [{record.location}]{posted}\n🔗 URL: {record.url}"
+
+async def run_source(source, store=None):
+    """Fetch one source, record unseen jobs and queue their notifications.
+
+    A job is new unless its id (or one of its legacy aliases) was stored
+    before, or it is a re-post: a job with the same content fingerprint was
+    first seen within the repost window by another source of its dedup
+    group, or by this source in an earlier run and is no longer listed.
+    Jobs of the same run never match each other, and a same-source match is
+    only decided once the run knows what it listed.
+    Everything the source listed, filtered or not, goes to the history
+    archive. Returns the number of new jobs.
+    """
+    store = store or seen_store.get_store()
+    first_run = source.quiet_first_run and store.count(source.name) == 0
+    # Sources that stream large boards apply the filter themselves, before building records
+    job_filter = None if getattr(source, "prefiltered", False) else getattr(source, "job_filter", None)
+    group = getattr(source, "dedup_group", None)
+    store.backfill_fingerprints(source.name, lambda title, location: job_identity.fingerprint(
+        group or source.company, title, location))
+    new_jobs = duplicates = 0
+    outcomes = {"filtered": 0, "seen": 0, "rekeyed": 0, "duplicate": 0, "new": 0}
+    listed = []
+    deferred = []  # (record, original job id): same title and place as an earlier job of this source
+    run_start = seen_store.now_iso()
+
+    def announce(record):
+        nonlocal new_jobs
+        new_jobs += 1
+        outcomes["new"] += 1
+        if first_run:
+            print(f"Found (first run): {record.title} — {record.location}")
+        else:
+            print(f"✨ New {record.company} job: {record.title} — {record.location}")
+            tel.send_notification(format_notification(record))
+
+    def skip_repost(record, original_source, original_id):
+        nonlocal duplicates
+        duplicates += 1
+        outcomes["duplicate"] += 1
+        print(f"♻️ Skipping {record.title} — {record.location}: same as {original_source} job {original_id}")
+
+    with metrics.span("source_run", SOURCE_SECONDS, source=source.name) as trace_fields:
+        try:
+            async for record in source.fetch():
+                listed.append(record)
+                if job_filter is not None and not job_filter.matches(record.title, record.location, record.posted):
+                    outcomes["filtered"] += 1
+                    continue
+                if store.contains(record.source, record.job_id):
+                    store.touch(record.source, record.job_id)  # still open, so not expired
+                    outcomes["seen"] += 1
+                    continue
+                fields = dict(title=record.title, location=record.location, url=record.url)
+                if any(store.contains(record.source, alias) for alias in record.aliases):
+                    # Stored under its old key; from now on it is found by its id
+                    store.add(record.source, record.job_id, **fields)
+                    outcomes["rekeyed"] += 1
+                    continue
+
+                fingerprint = job_identity.fingerprint(group or record.company, record.title, record.location)
+                original = store.find_fingerprint(fingerprint, run=(record.source, run_start))
+                store.add(record.source, record.job_id, fingerprint=fingerprint, **fields)
+                if seen_store.FLUSH_EVERY and store.pending_count() >= seen_store.FLUSH_EVERY:
+                    store.flush()  # low-memory mode: stream jobs to disk instead of buffering a whole run
+                if original is None:
+                    announce(record)
+                elif original[0] != record.source:
+                    skip_repost(record, *original)  # the same job on another board of the group
+                else:
+                    deferred.append((record, original[1]))
+        finally:
+            # Two requisitions with the same title and place can both be open; a re-post replaces its original
+            still_listed = getattr(source, "still_listed", ())
+            for job_id in still_listed:
+                store.touch(source.name, job_id)
+            listed_ids = {record.job_id for record in listed}.union(still_listed)
+            complete = getattr(source, "complete", False)
+            for record, original_id in deferred:
+                if original_id not in listed_ids and (complete or not store.listed_recently(source.name, original_id)):
+                    skip_repost(record, source.name, original_id)
+                else:
+                    announce(record)
+            store.flush()
+            for outcome, count in outcomes.items():
+                if count:
+                    JOBS.inc(count, source=source.name, outcome=outcome)
+            trace_fields.update(outcomes)
+
+    try:
+        await asyncio.to_thread(history.record_cycle, source.name, listed, getattr(source, "complete", False),
+                                still_listed=getattr(source, "still_listed", ()))
+    except Exception as e:
+        print(f"❌ Could not archive the {source.name} listing: {e}", file=sys.stderr)
+
+    # Only persist validators/watermarks once every fetched job is safely stored
+    commit = getattr(source, "commit", None)
+    if commit is not None:
+        await commit()
+    print(f"{source.company} ({source.name}) finished. Found {new_jobs} new jobs"
+          f"{f', skipped {duplicates} re-posts/duplicates' if duplicates else ''}.")
+    return new_jobs
+
+def run_once(name):
+    """Run a single source standalone, then deliver its notifications; returns the number of new jobs."""
+    import browser_pool  # only here: closes Chromium if the source borrowed it
+    new_jobs = browser_pool.run(lambda: run_source(build_source(name)))
+    tel.drain()
+    return new_jobs
+
+def poll_forever(name):
+    """Standalone polling loop for one source, on the adaptive schedule of scheduler.py."""
+    import scheduler
+    schedule = scheduler.SourceSchedule.from_options(name, settings.config[f"source:{name}"])
+    while True:
+        print(f"\n🔍 Checking {name} for jobs...")
+        start = time.monotonic()
+        ok = True
+        try:
+            new_jobs = run_once(name)
+        except Exception as e:
+            print(f"❌ Error running {name}: {e}", file=sys.stderr)
+            new_jobs, ok = 0, False
+        delay = schedule.record(new_jobs, time.monotonic() - start, ok)
+        print(f"\n[⏳] Sleeping for {delay / 60:.1f} minutes...\n")
+        time.sleep(delay)
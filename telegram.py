@@ -1,32 +1,21 @@
 import requests
-import os
+import http_client
+import notifier
+import settings
 import sys # Import sys for error handling
-import configparser # Import configparser
 from credentials import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID # Import credentials from a separate module
 
-# --- Configuration Reading ---
-CONFIG_FILE = 'config.ini'
-config = configparser.ConfigParser()
-notifications_enabled_from_config = True # Default to enabled
-
-try:
-    if os.path.exists(CONFIG_FILE):
-        config.read(CONFIG_FILE)
-        # Use getboolean for robust true/false parsing (handles 1/0, yes/no, true/false, on/off)
-        notifications_enabled_from_config = config.getboolean('settings', 'notifications_enabled', fallback=True)
-    else:
-        print(f"Warning: Config file '{CONFIG_FILE}' not found. Using default settings (notifications enabled).", file=sys.stderr)
-except (configparser.Error, ValueError) as e:
-    print(f"Warning: Error reading '{CONFIG_FILE}'. Using default settings (notifications enabled). Error: {e}", file=sys.stderr)
-
-NOTIFICATIONS_ENABLED = notifications_enabled_from_config
-
 # Optional: Check if essential credentials are set at module load time
 if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
     print("Warning: TELEGRAM_TOKEN or TELEGRAM_CHAT_ID environment variables not set. Notifications will fail if enabled.", file=sys.stderr)
 
+def notifications_enabled():
+    # Read on every message, so switching it in config.ini applies without a restart
+    return settings.getboolean('settings', 'notifications_enabled', True)
+
 def send_notification(message):
-    if not NOTIFICATIONS_ENABLED:
+    """Queue a message for delivery; the notifier worker sends it (see notifier.py)."""
+    if not notifications_enabled():
         # Optional: print a message indicating notifications are off
         # print("Info: Notifications are disabled via config file.", file=sys.stderr)
         return # Skip sending if disabled
@@ -35,6 +24,10 @@ def send_notification(message):
         print("Error: Cannot send Telegram notification due to missing TELEGRAM_TOKEN or TELEGRAM_CHAT_ID environment variables.", file=sys.stderr)
         return # Don't attempt to send if credentials are missing
 
+    notifier.enqueue(message)
+
+def deliver(message):
+    """Blocking send of one message; returns True once Telegram accepted it."""
     url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
@@ -42,7 +35,15 @@ def send_notification(message):
         "disable_notification": False # Keep notifications enabled by default on Telegram's side
     }
     try:
-        response = requests.post(url, data=payload, timeout=10) # Add timeout
+        # No retries here: a POST retried after a timeout can post the message twice, and the
+        # notifier already retries failed messages from the outbox (RETRY_DELAY, max_attempts)
+        response = http_client.post(url, data=payload, retries=0)
         response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        return True
     except requests.exceptions.RequestException as e:
         print(f"Error sending Telegram notification: {e}", file=sys.stderr)
+        return False
+
+def drain():
+    """Deliver queued notifications now; used when a scraper runs standalone."""
+    notifier.drain(deliver)
@@ -1,7 +1,7 @@
-import requests
+import http_client
 
 url = "https://boards-api.greenhouse.io/v1/boards/deepmind/jobs"
-response = requests.get(url)
+response = http_client.get(url)
 
 if response.status_code == 200:
     data = response.json()
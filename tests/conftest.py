@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "tests", "fixtures")
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+@pytest.fixture(scope="session")
+def credentials_dir(tmp_path_factory):
+    """A directory with a placeholder credentials.py, for checkouts without the real one."""
+    path = tmp_path_factory.mktemp("credentials")
+    (path / "credentials.py").write_text('TELEGRAM_TOKEN = ""\nTELEGRAM_CHAT_ID = ""\n')
+    return path
+
+@pytest.fixture
+def script_env(credentials_dir):
+    """Environment for running the repo's scripts in a subprocess; a real credentials.py still wins."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, str(credentials_dir), env.get("PYTHONPATH")]))
+    return env
+
+@pytest.fixture
+def credentials_on_path(credentials_dir, monkeypatch):
+    """Lets the modules that import credentials (telegram, and so sources) load in this process."""
+    monkeypatch.syspath_prepend(str(credentials_dir))
@@ -0,0 +1,53 @@
+"""bench_replay.py on the small recordings in tests/fixtures/replay, against fixed thresholds.
+
+The thresholds in tests/fixtures/bench_baseline.json are loose on purpose:
+they catch a scraper that stops finding jobs, slows down by an order of
+magnitude or starts leaking memory, not a few percent of noise.
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+from conftest import FIXTURES_DIR, REPO_DIR
+
+pytest.importorskip("requests")
+
+RECORDINGS_DIR = os.path.join(FIXTURES_DIR, "replay")
+BASELINE_PATH = os.path.join(FIXTURES_DIR, "bench_baseline.json")
+TIMEOUT = 300  # seconds
+
+def run_bench(env, fixtures_dir, *args):
+    return subprocess.run(
+        [sys.executable, "bench_replay.py", *args, "--rounds", "1", "--fixtures-dir", fixtures_dir],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=TIMEOUT,
+    )
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_sources_meet_baseline(script_env, tmp_path, baseline):
+    results_path = tmp_path / "results.json"
+    names = [name for name in baseline if name != "full_cycle"]
+    proc = run_bench(script_env, RECORDINGS_DIR, *names, "--save-baseline", str(results_path))
+    assert proc.returncode == 0, proc.stderr
+    results = json.loads(results_path.read_text())
+    for name, expected in baseline.items():
+        assert results[name]["jobs"] == expected["jobs"], name
+        assert results[name]["jobs_per_s"] >= expected["min_jobs_per_s"], (name, results[name])
+        assert results[name]["peak_rss_mb"] <= expected["max_peak_rss_mb"], (name, results[name])
+
+def test_fails_without_recordings(script_env, tmp_path):
+    proc = run_bench(script_env, str(tmp_path), "google")
+    assert proc.returncode != 0
+    assert "No recordings" in proc.stderr
+
+def test_fails_when_a_source_finds_nothing(script_env, tmp_path):
+    # Only DeepMind's board is recorded, so every Google request is a 404
+    with open(os.path.join(RECORDINGS_DIR, "deepmind.jsonl"), encoding="utf-8") as f:
+        (tmp_path / "deepmind.jsonl").write_text(f.read())
+    proc = run_bench(script_env, str(tmp_path), "google", "deepmind")
+    assert proc.returncode != 0
+    assert "No jobs found for google" in proc.stderr
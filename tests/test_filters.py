@@ -0,0 +1,36 @@
+"""Source filters as configured in the repo's config.ini."""
+import configparser
+import os
+import pytest
+from conftest import REPO_DIR
+
+@pytest.fixture
+def repo_config(credentials_on_path, monkeypatch):
+    import settings
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(os.path.join(REPO_DIR, settings.CONFIG_FILE))
+    monkeypatch.setattr(settings, "config", parser)
+    return parser
+
+def job_filter(name):
+    import sources
+    return sources.build_source(name).job_filter
+
+def test_deepmind_matches_its_listed_places(repo_config):
+    deepmind = job_filter("deepmind")
+    assert deepmind.matches("Research Engineer", "Mountain View, California, US")
+    assert deepmind.matches("Research Scientist", "Zurich, Switzerland")
+    assert deepmind.matches("Software Engineer", "New York City, New York, US")
+
+def test_deepmind_rejects_other_places(repo_config):
+    # "US" in "Mountain View, California, US" is part of that place, not the whole [location_aliases] us group
+    deepmind = job_filter("deepmind")
+    assert not deepmind.matches("Research Engineer", "Seattle, Washington, US")
+    assert not deepmind.matches("Research Engineer", "San Francisco, California, US")
+    assert not deepmind.matches("Research Engineer", "Geneva, Switzerland")
+
+def test_location_lines_still_expand_alias_groups(repo_config):
+    boards = job_filter("ats")
+    assert boards.matches("Research Engineer", "Toronto, ON")
+    assert boards.matches("Research Engineer", "Remote - Anywhere")
+    assert not boards.matches("Research Engineer", "London, UK")
@@ -0,0 +1,171 @@
+"""tor_circuits and http_client against a local SOCKS5 stand-in and a fake TOR controller.
+
+The stand-in accepts any username/password, records the username (the
+circuit TOR would have picked) and then answers the tunnelled HTTP request
+itself, with the statuses queued for its path or 200.
+"""
+import socketserver
+import sys
+import threading
+import types
+from collections import defaultdict, deque
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("socks")  # requests' SOCKS support
+
+import http_client
+import metrics
+import tor_circuits
+
+class Socks5Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        _, method_count = self.rfile.read(2)
+        if 2 not in self.rfile.read(method_count):
+            self.wfile.write(b"\x05\xff")
+            return
+        self.wfile.write(b"\x05\x02")  # username/password
+        _, username_length = self.rfile.read(2)
+        username = self.rfile.read(username_length).decode()
+        self.rfile.read(self.rfile.read(1)[0])  # password
+        self.server.usernames.append(username)
+        self.wfile.write(b"\x01\x00")
+        _, _, _, address_type = self.rfile.read(4)
+        address_length = {1: 4, 4: 16}.get(address_type) or self.rfile.read(1)[0]
+        self.rfile.read(address_length + 2)  # address and port
+        self.wfile.write(b"\x05\x00\x00\x01" + bytes(6))
+
+        # The stand-in is the destination as well
+        request_line = self.rfile.readline().decode()
+        while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+            pass
+        path = request_line.split()[1]
+        queued = self.server.statuses[path]
+        status = queued.popleft() if queued else 200
+        self.wfile.write(f"HTTP/1.1 {status} Stand-in\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok".encode())
+
+class Socks5Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Socks5Handler)
+        self.usernames = []
+        self.statuses = defaultdict(deque)
+
+class FakeController:
+    """Stands in for stem's Controller: one built circuit per SOCKS username the stand-in saw."""
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.closed = []
+        self.conf = {}
+
+    def from_port(self, port):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def authenticate(self):
+        pass
+
+    def get_circuits(self):
+        usernames = dict.fromkeys(self.proxy.usernames)
+        return [types.SimpleNamespace(id=str(index), status="BUILT", purpose="GENERAL", socks_username=username,
+                                      path=[(f"EXIT{index}", f"relay{index}")])
+                for index, username in enumerate(usernames)]
+
+    def close_circuit(self, circuit_id):
+        self.closed.append(circuit_id)
+
+    def set_conf(self, key, value):
+        self.conf[key] = value
+
+@pytest.fixture
+def proxy():
+    server = Socks5Server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def controller(proxy, monkeypatch):
+    fake = FakeController(proxy)
+    stem = types.ModuleType("stem")
+    stem.CircStatus = types.SimpleNamespace(BUILT="BUILT")
+    stem_control = types.ModuleType("stem.control")
+    stem_control.Controller = fake
+    stem.control = stem_control
+    monkeypatch.setitem(sys.modules, "stem", stem)
+    monkeypatch.setitem(sys.modules, "stem.control", stem_control)
+    return fake
+
+@pytest.fixture
+def manager(proxy, controller, monkeypatch):
+    monkeypatch.setattr(tor_circuits, "SOCKS_HOST", "127.0.0.1")
+    monkeypatch.setattr(tor_circuits, "SOCKS_PORT", proxy.server_address[1])
+    monkeypatch.setattr(tor_circuits, "TOR_SOURCES", {"alpha", "beta"})
+    monkeypatch.setattr(tor_circuits, "_manager", tor_circuits.CircuitManager())
+    monkeypatch.setattr(http_client, "_source_sessions", {})
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(http_client.replay, "STUB_URL", "")
+    monkeypatch.setattr(metrics, "TRACE_FILE", "")
+    return tor_circuits.get_manager()
+
+def test_each_source_gets_its_own_socks_username(proxy, manager):
+    for source in ("alpha", "beta", "alpha"):
+        assert http_client.get("http://jobs.example/ok", source=source).status_code == 200
+    assert proxy.usernames == ["alpha-0", "beta-0", "alpha-0"]
+
+def test_block_rotates_only_the_blocked_source(proxy, controller, manager):
+    proxy.statuses["/blocked"].append(403)
+    response = http_client.get("http://jobs.example/blocked", source="alpha", retries=1)
+    assert response.status_code == 200
+    # The retry went out on a fresh circuit, and the old one was closed
+    assert proxy.usernames == ["alpha-0", "alpha-1"]
+    assert controller.closed == ["0"]
+    assert "ExcludeExitNodes" not in controller.conf
+    http_client.get("http://jobs.example/ok", source="beta")
+    assert proxy.usernames[-1] == "beta-0"
+
+def test_stats_are_an_ewma_per_circuit(manager):
+    manager.record("alpha", 1.0)
+    manager.record("alpha", 2.0, ok=False)
+    stats = manager._stats["alpha"]
+    assert stats.latency == pytest.approx(tor_circuits.EWMA_ALPHA * 2.0 + (1 - tor_circuits.EWMA_ALPHA) * 1.0)
+    assert stats.requests == 2
+    assert stats.failure_rate == 0.5
+    manager.record("alpha", None, ok=False)  # connection error: no latency sample
+    assert stats.latency == pytest.approx(tor_circuits.EWMA_ALPHA * 2.0 + (1 - tor_circuits.EWMA_ALPHA) * 1.0)
+    assert "beta" not in manager._stats
+
+def test_requests_feed_the_circuit_stats(proxy, manager):
+    http_client.get("http://jobs.example/ok", source="alpha")
+    stats = manager._stats["alpha"]
+    assert stats.requests == 1 and stats.failures == 0
+    assert stats.latency is not None
+
+def test_slow_circuit_is_rotated_and_its_exit_excluded(proxy, controller, manager, monkeypatch):
+    monkeypatch.setattr(tor_circuits, "SLOW_LATENCY", 0.0)
+    for _ in range(tor_circuits.MIN_SAMPLES):
+        http_client.get("http://jobs.example/ok", source="alpha")
+    assert manager.username("alpha") == "alpha-1"
+    assert list(manager.excluded_exits) == ["EXIT0"]
+    assert controller.conf["ExcludeExitNodes"] == "$EXIT0"
+    http_client.get("http://jobs.example/ok", source="alpha")
+    assert proxy.usernames[-1] == "alpha-1"
+
+def test_failing_circuit_is_rotated_and_its_exit_excluded(proxy, controller, manager):
+    http_client.get("http://jobs.example/ok", source="alpha")
+    http_client.get("http://jobs.example/ok", source="beta")
+    for _ in range(tor_circuits.MIN_SAMPLES):
+        manager.record("beta", 0.1, ok=False)
+    assert manager.username("beta") == "beta-1"
+    assert manager.username("alpha") == "alpha-0"
+    assert controller.closed == ["1"]
+    assert controller.conf["ExcludeExitNodes"] == "$EXIT1"
@@ -0,0 +1,65 @@
+"""Batches a worker sends back to the coordinator, stored through run_source as in queue mode."""
+import asyncio
+import threading
+import types
+import pytest
+
+@pytest.fixture
+def queue_env(tmp_path, credentials_on_path, monkeypatch):
+    import history
+    import metrics
+    import seen_store
+    import sources
+    import work_queue
+    monkeypatch.setattr(seen_store, "_store", seen_store.SeenStore(str(tmp_path / "seen.db"), str(tmp_path / "seen.bloom")))
+    monkeypatch.setattr(history, "HISTORY_DB", str(tmp_path / "seen.db"))
+    monkeypatch.setattr(history, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(history, "_local", threading.local())
+    monkeypatch.setattr(work_queue, "QUEUE_DB", str(tmp_path / "queue.db"))
+    monkeypatch.setattr(work_queue, "_local", threading.local())
+    monkeypatch.setattr(metrics, "TRACE_FILE", "")
+    monkeypatch.setattr(sources.tel, "send_notification", lambda message: None)
+    return work_queue
+
+def board_record(job_id):
+    import sources
+    return sources.JobRecord(source="deepmind", job_id=job_id, company="DeepMind", title=f"Research Engineer {job_id}",
+                             location="Zurich, Switzerland", url=f"https://boards.greenhouse.io/deepmind/jobs/{job_id}")
+
+def store_batch(work_queue, records, complete, still_listed=()):
+    """One sweep as the coordinator stores it: packed by the worker, unpacked into a BatchSource."""
+    import sources
+    source = types.SimpleNamespace(name="deepmind", company="DeepMind", quiet_first_run=False, dedup_group="google",
+                                   job_filter=None, prefiltered=True)
+    task_id = work_queue.enqueue("deepmind", 60)
+    blob = work_queue.pack(records, complete, still_listed)
+    batch_records, batch_complete, batch_still_listed = work_queue.unpack("deepmind", blob)
+    batch = work_queue.BatchSource(source, task_id, batch_records, batch_complete, batch_still_listed)
+    return asyncio.run(sources.run_source(batch))
+
+def open_postings():
+    import history
+    return sorted(row[0] for row in history._connect().execute(
+        "SELECT job_id FROM current_postings WHERE source = 'deepmind'"))
+
+def test_unchanged_board_keeps_its_postings_open(queue_env):
+    assert store_batch(queue_env, [board_record("1"), board_record("2")], complete=True) == 2
+    # The next sweep: the board answered 304, so it lists nothing itself but still lists 1 and 2
+    assert store_batch(queue_env, [], complete=True, still_listed=["1", "2"]) == 0
+    assert open_postings() == ["1", "2"]
+
+    import seen_store
+    store = seen_store.get_store()
+    assert store.listed_recently("deepmind", "1", 1)
+    assert store._sightings == set()  # touched and flushed
+
+def test_board_that_lost_a_posting_closes_it(queue_env):
+    store_batch(queue_env, [board_record("1"), board_record("2")], complete=True)
+    store_batch(queue_env, [board_record("1")], complete=True)
+    assert open_postings() == ["1"]
+
+def test_batch_without_still_listed_is_never_complete(queue_env):
+    import json
+    import zlib
+    blob = zlib.compress(json.dumps({"complete": True, "jobs": []}).encode("utf-8"))
+    assert queue_env.unpack("deepmind", blob) == ([], False, [])
@@ -0,0 +1,154 @@
+import functools
+import sys
+import threading
+import time
+from collections import deque
+import metrics
+import settings
+
+print = functools.partial(print, flush=True)
+
+CONTROL_PORT = settings.getint('tor', 'control_port', 9051)
+SOCKS_HOST = settings.get('tor', 'socks_host', '127.0.0.1')
+SOCKS_PORT = settings.getint('tor', 'socks_port', 9050)
+# requests-based sources routed through TOR (the browser is configured in [browser])
+TOR_SOURCES = {s.strip() for s in settings.get('tor', 'sources', '').split(',') if s.strip()}
+SLOW_LATENCY = settings.getfloat('tor', 'slow_latency', 20.0)  # seconds (EWMA) before an exit counts as slow
+MAX_FAILURE_RATE = settings.getfloat('tor', 'max_failure_rate', 0.5)
+MIN_SAMPLES = 3  # requests on a circuit before judging it
+MAX_EXCLUDED_EXITS = 20
+EWMA_ALPHA = 0.3
+BLOCK_STATUSES = {403, 429}
+
+CIRCUIT_LATENCY = metrics.gauge("tor_circuit_latency_seconds", "Average request latency on a source's current circuit")
+CIRCUIT_FAILURE_RATE = metrics.gauge("tor_circuit_failure_rate", "Failed request ratio on a source's current circuit")
+CIRCUIT_ROTATIONS = metrics.counter("tor_circuit_rotations_total", "Circuit rotations by source and cause")
+EXCLUDED_EXITS = metrics.gauge("tor_excluded_exits", "Exit relays excluded for being slow or failing")
+
+class CircuitStats:
+    def __init__(self):
+        self.created = time.time()
+        self.requests = 0
+        self.failures = 0
+        self.latency = None  # exponentially weighted moving average, seconds
+
+    def record(self, latency, ok):
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+
+    @property
+    def failure_rate(self):
+        return self.failures / self.requests if self.requests else 0.0
+
+class CircuitManager:
+    """Gives every source its own TOR circuit and rotates it only when it misbehaves.
+
+    Isolation uses SOCKS authentication: TOR never shares a circuit between
+    different SOCKS usernames (IsolateSOCKSAuth, on by default), so a source's
+    circuit is named by ``<source>-<generation>`` and rotating just bumps the
+    generation. Chromium can't send SOCKS credentials, so browser traffic
+    (``source=None``) shares the unauthenticated circuits and rotating it
+    closes those through the control port.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = {}
+        self._stats = {}
+        self.excluded_exits = deque(maxlen=MAX_EXCLUDED_EXITS)
+
+    def username(self, source):
+        if source is None:
+            return None
+        with self._lock:
+            return f"{source}-{self._generation.get(source, 0)}"
+
+    def proxy_url(self, source):
+        # The password is irrelevant, only the username/password pair isolates
+        return f"socks5h://{self.username(source)}:isolate@{SOCKS_HOST}:{SOCKS_PORT}"
+
+    def record(self, source, latency, ok=True):
+        """Record one request made over ``source``'s circuit; drops it if it turned slow or flaky."""
+        with self._lock:
+            stats = self._stats.setdefault(source, CircuitStats())
+            stats.record(latency, ok)
+            if stats.requests < MIN_SAMPLES:
+                return
+            slow = stats.latency is not None and stats.latency > SLOW_LATENCY
+            failing = stats.failure_rate > MAX_FAILURE_RATE
+        if slow:
+            self.rotate(source, f"slow exit ({stats.latency:.1f}s average)", exclude_exit=True)
+        elif failing:
+            self.rotate(source, f"{stats.failure_rate:.0%} of requests failing", exclude_exit=True)
+
+    def report_block(self, source, reason):
+        """Called on block signals (captcha, 403/429, empty first page)."""
+        self.rotate(source, f"blocked: {reason}")
+
+    def rotate(self, source, reason, exclude_exit=False):
+        old_username = self.username(source)
+        with self._lock:
+            if source is not None:
+                self._generation[source] = self._generation.get(source, 0) + 1
+            self._stats.pop(source, None)
+        print(f"🔄 Rotating TOR circuit for {source or 'browser'}: {reason}")
+        CIRCUIT_ROTATIONS.inc(source=source or "browser", cause="exit" if exclude_exit else "block")
+        metrics.trace("tor_rotation", source=source or "browser", reason=reason)
+        try:
+            self._close_circuits(old_username, exclude_exit)
+        except Exception as e:
+            print(f"❌ Error talking to the TOR control port: {e}", file=sys.stderr)
+
+    def _close_circuits(self, username, exclude_exit):
+        # stem is only loaded once a circuit is actually rotated
+        from stem import CircStatus
+        from stem.control import Controller
+        with Controller.from_port(port=CONTROL_PORT) as controller:
+            controller.authenticate()
+            for circuit in controller.get_circuits():
+                if circuit.status != CircStatus.BUILT or circuit.purpose != "GENERAL":
+                    continue
+                if getattr(circuit, "socks_username", None) != username:
+                    continue
+                if exclude_exit and circuit.path:
+                    exit_fingerprint = circuit.path[-1][0]
+                    if exit_fingerprint not in self.excluded_exits:
+                        self.excluded_exits.append(exit_fingerprint)
+                controller.close_circuit(circuit.id)
+            if exclude_exit and self.excluded_exits:
+                controller.set_conf("ExcludeExitNodes", ",".join(f"${fp}" for fp in self.excluded_exits))
+
+    def report(self):
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[0] or "")
+        for source, stats in items:
+            latency = f"{stats.latency:.1f}s" if stats.latency is not None else "n/a"
+            print(f"  🧅 {source or 'browser'}: {stats.requests} requests, {stats.failure_rate:.0%} failed, "
+                  f"avg latency {latency}, circuit age {time.time() - stats.created:.0f}s")
+        if self.excluded_exits:
+            print(f"  🧅 {len(self.excluded_exits)} slow/failing exits excluded")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+@metrics.on_collect
+def _collect():
+    if _manager is None:
+        return
+    with _manager._lock:
+        items = list(_manager._stats.items())
+    for source, stats in items:
+        if stats.latency is not None:
+            CIRCUIT_LATENCY.set(round(stats.latency, 3), source=source or "browser")
+        CIRCUIT_FAILURE_RATE.set(round(stats.failure_rate, 3), source=source or "browser")
+    EXCLUDED_EXITS.set(len(_manager.excluded_exits))
+
+def get_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CircuitManager()
+    return _manager
@@ -0,0 +1,305 @@
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+import memory_guard
+import metrics
+import settings
+import sources
+
+print = functools.partial(print, flush=True)
+
+# inline: scrapers run in the main process. queue: the coordinator puts every poll in the
+# task queue and worker processes (on this Pi or others) fetch it; jobs are still stored
+# and notified by the coordinator alone, and a lease keeps it to one per queue
+MODE = settings.get('workers', 'mode', 'inline')
+PROCESSES = memory_guard.cap(settings.getint('workers', 'processes', 3), 1)  # local workers the coordinator starts
+QUEUE_DB = settings.get('workers', 'queue_path', 'work_queue.db')
+RESULT_POLL = 0.5  # seconds between checks for a task's result
+IDLE_POLL = 2  # seconds a worker waits before looking for work again
+ACK_TIMEOUT = 60  # seconds a worker waits for the coordinator to store its batch before giving up on commit()
+LEASE_MARGIN = 60  # seconds a source lease outlives the scraper timeout
+COORDINATOR_LEASE = 180  # seconds; renewed every third of it, a standby takes over once it lapses
+
+TASKS = metrics.counter("worker_tasks_total", "Queued fetch tasks by source and final status")
+BATCH_BYTES = metrics.histogram("worker_batch_bytes", "Size of the compressed job batches workers send back",
+                                (1024, 4096, 16384, 65536, 262144, 1048576))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    source   TEXT NOT NULL,
+    status   TEXT NOT NULL DEFAULT 'pending',
+    worker   TEXT,
+    created  REAL NOT NULL,
+    deadline REAL NOT NULL,
+    result   BLOB,
+    error    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, id);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name    TEXT PRIMARY KEY,
+    owner   TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+# Task lifecycle: pending -> running -> fetched (batch ready) -> stored (coordinator is done),
+# or failed/cancelled. Times are Unix timestamps, so the nodes' clocks must agree (NTP).
+FINISHED = ("stored", "failed", "cancelled")
+KEEP_FINISHED = 24 * 3600  # seconds finished tasks are kept for inspection
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        # No WAL: it needs shared memory, which a queue on an NFS export shared by several Pis doesn't have
+        conn = sqlite3.connect(QUEUE_DB, timeout=30)
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def owner():
+    """This process, as named in leases and tasks."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# --- Leases ---
+def acquire_lease(name, ttl):
+    """Take or renew the lease ``name`` for ``ttl`` seconds; False while another process holds it."""
+    me, now = owner(), time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+            (name, me, now + ttl, now),
+        )
+        holder = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+    return holder is not None and holder[0] == me
+
+def release_lease(name):
+    with _connect() as conn:
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner()))
+
+def lease_holder(name):
+    row = _connect().execute(
+        "SELECT owner FROM leases WHERE name = ? AND expires >= ?", (name, time.time())
+    ).fetchone()
+    return row[0] if row else None
+
+async def become_coordinator():
+    """Wait until this process holds the coordinator lease of the queue.
+
+    Jobs are deduplicated and notified against the coordinator's own seen
+    store and outbox, so a second coordinator on the same queue would notify
+    them again; it stands by instead, and takes over if the lease lapses.
+    """
+    announced = False
+    while not await asyncio.to_thread(acquire_lease, "coordinator", COORDINATOR_LEASE):
+        if not announced:
+            print(f"⏸️ {lease_holder('coordinator')} coordinates {QUEUE_DB}, standing by.")
+            announced = True
+        await asyncio.sleep(COORDINATOR_LEASE / 3)
+    print(f"👑 Coordinating {QUEUE_DB} as {owner()}.")
+
+async def hold_coordinator():
+    """Renew the coordinator lease; returns once it was lost, e.g. after this process stalled past it."""
+    while await asyncio.to_thread(acquire_lease, "coordinator", COORDINATOR_LEASE):
+        await asyncio.sleep(COORDINATOR_LEASE / 3)
+    print(f"❌ {lease_holder('coordinator')} took over as coordinator of {QUEUE_DB}, stopping.", file=sys.stderr)
+
+# --- Job batches ---
+BATCH_FIELDS = ("job_id", "company", "title", "location", "url", "posted", "aliases", "details")
+
+def pack(records, complete=False, still_listed=()):
+    """JobRecords of one source as zlib-compressed JSON rows, plus whether the listing is complete
+    and the ids listed by parts of it that weren't downloaded (see ``Source.still_listed``)."""
+    rows = [[getattr(record, field) for field in BATCH_FIELDS] for record in records]
+    batch = {"complete": complete, "still_listed": list(still_listed), "jobs": rows}
+    return zlib.compress(json.dumps(batch, separators=(",", ":")).encode("utf-8"))
+
+def unpack(source_name, blob):
+    """``(records, complete, still_listed)`` of a packed batch."""
+    batch = json.loads(zlib.decompress(blob))
+    records = []
+    for row in batch["jobs"]:
+        fields = dict(zip(BATCH_FIELDS, row))
+        fields["aliases"] = tuple(fields["aliases"] or ())
+        records.append(sources.JobRecord(source=source_name, **fields))
+    # Batches from a worker that predates still_listed never count as complete: they'd close unchanged boards
+    if "still_listed" not in batch:
+        return records, False, []
+    return records, batch["complete"], batch["still_listed"]
+
+# --- Tasks ---
+def enqueue(source_name, timeout):
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("DELETE FROM tasks WHERE status IN (?, ?, ?) AND created < ?", (*FINISHED, now - KEEP_FINISHED))
+        return conn.execute(
+            "INSERT INTO tasks (source, created, deadline) VALUES (?, ?, ?)", (source_name, now, now + timeout)
+        ).lastrowid
+
+def claim():
+    """Take the oldest pending task; returns ``(task_id, source, deadline)`` or None."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # two workers must not read the same pending row
+        row = conn.execute(
+            "SELECT id, source, deadline FROM tasks WHERE status = 'pending' AND deadline > ? ORDER BY id LIMIT 1",
+            (time.time(),),
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE tasks SET status = 'running', worker = ? WHERE id = ?", (owner(), row[0]))
+        conn.commit()
+        return row
+    except BaseException:
+        conn.rollback()
+        raise
+
+def finish(task_id, batch=None, error=None):
+    """Hand a running task's batch (or error) back to the coordinator."""
+    with _connect() as conn:
+        if error is None:
+            conn.execute("UPDATE tasks SET status = 'fetched', result = ? WHERE id = ? AND status = 'running'",
+                         (batch, task_id))
+        else:
+            conn.execute("UPDATE tasks SET status = 'failed', error = ? WHERE id = ? AND status = 'running'",
+                         (error, task_id))
+
+def set_status(task_id, status):
+    with _connect() as conn:
+        conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (status, task_id))
+
+def cancel(task_id):
+    """Withdraw a task nobody has finished; a worker still fetching it discards its batch."""
+    with _connect() as conn:
+        conn.execute("UPDATE tasks SET status = 'cancelled' WHERE id = ? AND status IN ('pending', 'running', 'fetched')",
+                     (task_id,))
+
+def get_task(task_id):
+    """``(status, result, error)`` of a task."""
+    return _connect().execute("SELECT status, result, error FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+async def wait_for_status(task_id, statuses, timeout):
+    """Poll until the task reaches one of ``statuses``; returns ``(status, result, error)``."""
+    deadline = time.monotonic() + timeout
+    while True:
+        task = await asyncio.to_thread(get_task, task_id)
+        if task is None or task[0] in statuses or task[0] in FINISHED:
+            return task or ("cancelled", None, None)
+        if time.monotonic() >= deadline:
+            raise asyncio.TimeoutError
+        await asyncio.sleep(RESULT_POLL)
+
+# --- Coordinator side ---
+class BatchSource:
+    """A worker's batch standing in for its source, so run_source filters, stores,
+    archives and notifies it as usual.
+
+    ``commit()`` tells the worker the jobs are stored; only then does it save
+    the source's own state (validators, watermarks).
+    """
+
+    def __init__(self, source, task_id, records, complete, still_listed=()):
+        self.name = source.name
+        self.company = source.company
+        self.quiet_first_run = source.quiet_first_run
+        self.dedup_group = getattr(source, "dedup_group", None)
+        self.job_filter = source.job_filter
+        self.prefiltered = getattr(source, "prefiltered", False)
+        self.complete = complete
+        self.still_listed = still_listed
+        self.task_id = task_id
+        self.records = records
+
+    async def fetch(self):
+        for record in self.records:
+            yield record
+
+    async def commit(self):
+        await asyncio.to_thread(set_status, self.task_id, "stored")
+
+async def dispatch(source, timeout):
+    """Have a worker fetch ``source``, then store and notify its jobs here; returns the number of new jobs."""
+    task_id = await asyncio.to_thread(enqueue, source.name, timeout)
+    try:
+        status, result, error = await wait_for_status(task_id, ("fetched",), timeout)
+    except BaseException:
+        await asyncio.to_thread(cancel, task_id)
+        TASKS.inc(source=source.name, status="cancelled")
+        raise
+    if status != "fetched":
+        TASKS.inc(source=source.name, status=status)
+        raise RuntimeError(f"worker task {status}: {error}")
+    BATCH_BYTES.observe(len(result), source=source.name)
+    records, complete, still_listed = unpack(source.name, result)
+    new_jobs = await sources.run_source(BatchSource(source, task_id, records, complete, still_listed))
+    TASKS.inc(source=source.name, status="stored")
+    return new_jobs
+
+# --- Worker side ---
+_sources = {}
+
+async def run_task(task_id, name):
+    """Fetch one source into a batch; the coordinator stores it, then the source commits here."""
+    # Workers follow config.ini edits too, rebuilding only the sources whose options changed
+    settings.reload(check=sources.check_config)
+    source = _sources.get(name)
+    if source is None or source.config_key != sources.config_key(name):
+        source = _sources[name] = sources.build_source(name)
+    # Unfiltered: the coordinator archives the whole listing before filtering it
+    records = [record async for record in source.fetch()]
+    batch = pack(records, getattr(source, "complete", False), getattr(source, "still_listed", ()))
+    await asyncio.to_thread(finish, task_id, batch)
+    try:
+        status, _, _ = await wait_for_status(task_id, ("stored",), ACK_TIMEOUT)
+    except asyncio.TimeoutError:
+        status = "unacknowledged"
+    if status == "stored":
+        await source.commit()
+    else:
+        print(f"⚠️ {name} batch was not stored ({status}), it will be fetched again next time.", file=sys.stderr)
+    return len(records)
+
+async def worker_loop():
+    print(f"👷 Worker {owner()} waiting for tasks in {QUEUE_DB}.")
+    while True:
+        task = await asyncio.to_thread(claim)
+        if task is None:
+            await asyncio.sleep(IDLE_POLL)
+            continue
+        task_id, name, deadline = task
+        start = time.monotonic()
+        try:
+            jobs = await asyncio.wait_for(run_task(task_id, name), max(1.0, deadline - time.time()))
+            print(f"👷 {name}: {jobs} jobs sent in {time.monotonic() - start:.1f}s.")
+        except Exception as e:
+            message = f"{type(e).__name__}: {e}"
+            print(f"❌ Worker task {task_id} ({name}) failed: {message}", file=sys.stderr)
+            await asyncio.to_thread(finish, task_id, error=message)
+
+def run_worker():
+    """Entry point of a worker process: fetch queued tasks until killed."""
+    import browser_pool
+    browser_pool.run(worker_loop)
+
+def start_workers(count=PROCESSES):
+    """Start ``count`` local worker processes; they stop with the coordinator."""
+    # Fresh interpreters: forking would copy the event loop, Chromium handles and SQLite connections
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for number in range(count):
+        process = context.Process(target=run_worker, name=f"worker-{number + 1}", daemon=True)
+        process.start()
+        workers.append(process)
+    print(f"👷 Started {count} local worker processes.")
+    return workers